@@ -8,12 +8,13 @@ from datetime import datetime, date
 from pydantic import BaseModel
 import logging
 
-from config import API_SECRET_KEY
+from config import API_SECRET_KEY, POOL_STATS_PATH
 from database.db_sqlserver import (
     get_teacher_requests, create_request, get_session,
     get_schedules_by_group_and_date, get_teacher_schedules
 )
 from database.models import RequestStatus, RequestType
+from database.pool_metrics import read_snapshot
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -133,6 +134,24 @@ async def get_admin_logs(
     return []
 
 
+@app.get("/api/metrics/db-pool")
+async def get_db_pool_metrics(
+    api_key: str = Depends(verify_api_key)
+):
+    """Метрики пула соединений PostgreSQL из последнего снимка, опубликованного ботом
+
+    Пул создается только в процессе бота; age_seconds - возраст снимка,
+    statements - число вызовов и время подготовленных запросов.
+    """
+    try:
+        return read_snapshot(POOL_STATS_PATH)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="Бот еще не опубликовал метрики пула")
+    except (OSError, ValueError) as e:
+        logger.error(f"Не удалось прочитать метрики пула {POOL_STATS_PATH}: {e}")
+        raise HTTPException(status_code=500, detail="Метрики пула не прочитаны")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,20 @@
+"""
+Бенчмарки производительности
+
+Запуск: python -m benchmarks.<имя модуля> --help
+"""
+import atexit
+import os
+import tempfile
+
+# Макеты синтетических файлов не должны попадать в рабочий кэш макетов
+# (см. utils.excel_layout): на время запуска кэш хранится во временном
+# файле. Переменная задается до импорта config и наследуется процессами
+# пула разбора, файл удаляет процесс, который его создал.
+if 'BENCHMARK_EXCEL_LAYOUT_CACHE_PATH' not in os.environ:
+    fd, _layout_cache_path = tempfile.mkstemp(prefix='benchmark_excel_layouts.', suffix='.json')
+    os.close(fd)
+    os.remove(_layout_cache_path)
+    os.environ['BENCHMARK_EXCEL_LAYOUT_CACHE_PATH'] = _layout_cache_path
+    atexit.register(lambda: os.path.exists(_layout_cache_path) and os.remove(_layout_cache_path))
+os.environ['EXCEL_LAYOUT_CACHE_PATH'] = os.environ['BENCHMARK_EXCEL_LAYOUT_CACHE_PATH']
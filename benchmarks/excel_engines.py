@@ -0,0 +1,53 @@
+"""
+Бенчмарк движков разбора Excel: python (по строкам) против pandas
+
+Создает синтетический .xlsx файл (по умолчанию 100 000 строк), разбирает
+его обоими движками parse_workbook и проверяет, что записи совпадают.
+
+Запуск: python -m benchmarks.excel_engines --rows 100000 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.workbooks import write_xlsx
+from database.db_postgresql import _with_sort_keys
+from utils.excel_parser import EXCEL_PARSER_ENGINES, parse_workbook
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000, help='число строк в файле')
+    parser.add_argument('--repeat', type=int, default=3, help='повторов на движок')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.xlsx')
+        started = time.perf_counter()
+        write_xlsx(path, args.rows)
+        print(f"Файл {args.rows} строк создан за {time.perf_counter() - started:.1f} с")
+
+        results = {}
+        for engine in EXCEL_PARSER_ENGINES:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                records = parse_workbook(path, 'Бенчмарк', engine)
+                timings.append(time.perf_counter() - started)
+            # Ключи сортировки python-движок вычисляет при записи в БД - сравниваем полные записи
+            results[engine] = [_with_sort_keys(record) for record in records]
+            median = statistics.median(timings)
+            print(f"{engine:>7}: {len(records)} записей, медиана {median:.2f} с "
+                  f"({len(records) / median:.0f} строк/с)")
+
+        baseline = results[EXCEL_PARSER_ENGINES[0]]
+        for engine, records in results.items():
+            if records != baseline:
+                raise SystemExit(f"Записи движка {engine} отличаются от {EXCEL_PARSER_ENGINES[0]}")
+        print("Результаты движков совпадают")
+
+
+if __name__ == '__main__':
+    main()
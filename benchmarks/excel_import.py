@@ -0,0 +1,197 @@
+"""
+Бенчмарк импорта Excel: скорость, пиковая память и время по этапам
+
+Генерирует синтетические файлы (см. benchmarks.workbooks) и импортирует их:
+1. По этапам, в текущем процессе: open, header, normalize (parse_workbook),
+   hash (file_sha256) и write - запись в приемник:
+   - memory: сравнение с записями в памяти через diff_schedules, без БД;
+   - postgres: sync_specialty_schedules в базу из config.
+2. Только для postgres - полный load_all_excel_files с пулом процессов
+   (с --pipeline - через потоковый конвейер, см. utils.import_pipeline).
+
+Для postgres используются специальности bench-NNN, их записи и журнал
+импорта удаляются до и после прогона. Пиковая память (RSS) - максимум
+процесса за все время работы, поэтому движки лучше сравнивать отдельными
+запусками.
+
+Запуск: python -m benchmarks.excel_import --rows 20000 --files 4 --sink memory
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.workbooks import DAY_STYLES, HEADER_VARIANTS, WRITERS, generate_dataset
+from database.schedule_diff import diff_schedules
+from utils.excel_parser import EXCEL_PARSER_ENGINES, file_sha256, parse_workbook
+
+STAGES = ('open', 'header', 'normalize', 'hash', 'write')
+
+# Колонки записи расписания в строке приемника (см. SCHEDULE_RECORD_COLUMNS)
+_ROW_COLUMNS = ('specialty', 'semester', 'day_of_week', 'time', 'subject', 'teacher', 'room', 'group_name')
+
+
+def _peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss в килобайтах на Linux и в байтах на macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class MemorySink:
+    """Приемник записей в памяти с той же логикой сравнения, что и в БД"""
+
+    def __init__(self):
+        self.rows: Dict[str, List[dict]] = {}
+        self._next_id = 1
+
+    async def write(self, specialty: str, records: list, files: list) -> Dict[str, int]:
+        existing = self.rows.get(specialty, [])
+        diff = diff_schedules(existing, records)
+
+        deleted = set(diff.deletes)
+        updates = {update[0]: update[1:] for update in diff.updates}
+        rows = []
+        for row in existing:
+            if row['id'] in deleted:
+                continue
+            if row['id'] in updates:
+                row['semester'], row['teacher'], row['room'] = updates[row['id']]
+            rows.append(row)
+        for record in diff.inserts:
+            row = dict(zip(_ROW_COLUMNS, record))
+            row['id'] = self._next_id
+            self._next_id += 1
+            rows.append(row)
+        self.rows[specialty] = rows
+        return {'inserted': len(diff.inserts), 'updated': len(diff.updates),
+                'deleted': len(diff.deletes), 'unchanged': diff.unchanged}
+
+    async def close(self):
+        pass
+
+
+class PostgresSink:
+    """Приемник записей в PostgreSQL через sync_specialty_schedules"""
+
+    def __init__(self, specialties: List[str]):
+        self.specialties = specialties
+
+    async def open(self):
+        from database.db_postgresql import init_db
+        await init_db()
+        await self.cleanup()
+
+    async def write(self, specialty: str, records: list, files: list) -> Dict[str, int]:
+        from database.db_postgresql import sync_specialty_schedules
+        return await sync_specialty_schedules(specialty, records, files)
+
+    async def cleanup(self):
+        from database.db_postgresql import acquire, bump_schedule_version, invalidate_specialty_catalog
+        async with acquire() as conn:
+            await conn.execute('DELETE FROM schedules WHERE specialty = ANY($1::varchar[])', self.specialties)
+            await conn.execute('DELETE FROM import_ledger WHERE specialty = ANY($1::varchar[])', self.specialties)
+            await conn.execute('DELETE FROM specialties WHERE name = ANY($1::varchar[])', self.specialties)
+        bump_schedule_version()
+        invalidate_specialty_catalog()
+
+    async def close(self):
+        from database.db_postgresql import close_pool
+        await self.cleanup()
+        await close_pool()
+
+
+def _print_stages(timings: Dict[str, float], rows: int):
+    total = sum(timings.values())
+    for stage in STAGES:
+        value = timings.get(stage, 0.0)
+        share = value / total * 100 if total else 0.0
+        print(f"  {stage:<10} {value:8.3f} с  {share:5.1f}%")
+    print(f"  {'всего':<10} {total:8.3f} с  {rows / total if total else 0:.0f} строк/с")
+
+
+async def _run_stages(paths: List[str], sink, engine: str) -> int:
+    timings: Dict[str, float] = {}
+    total_rows = 0
+    for path in paths:
+        specialty = os.path.splitext(os.path.basename(path))[0]
+        records = parse_workbook(path, specialty, engine, timings)
+
+        started = time.perf_counter()
+        content_hash = file_sha256(path)
+        hashed = time.perf_counter()
+        await sink.write(specialty, records, [(path, content_hash, len(records))])
+        timings['hash'] = timings.get('hash', 0.0) + hashed - started
+        timings['write'] = timings.get('write', 0.0) + time.perf_counter() - hashed
+        total_rows += len(records)
+
+    print(f"\nПо этапам (движок {engine}): {total_rows} записей")
+    _print_stages(timings, total_rows)
+    print(f"  пиковая память процесса: {_peak_rss_mb():.0f} МБ")
+    return total_rows
+
+
+async def _run_full_import(directory: str, sink: PostgresSink, engine: str, workers: int, pipeline: bool):
+    from utils.excel_parser import load_all_excel_files
+
+    await sink.cleanup()
+    started = time.perf_counter()
+    changed = await load_all_excel_files(
+        workers=workers, folders=[directory], force=True, engine=engine, pipeline=pipeline
+    )
+    elapsed = time.perf_counter() - started
+    how = 'конвейер' if pipeline else f'процессов {workers}'
+    print(f"\nload_all_excel_files ({how}): {changed} записей за {elapsed:.2f} с "
+          f"({changed / elapsed if elapsed else 0:.0f} строк/с)")
+    print(f"  пиковая память: процесс {_peak_rss_mb():.0f} МБ, "
+          f"воркеры {_peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} МБ")
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        paths = generate_dataset(
+            directory, args.files, args.rows, args.format,
+            sheets=args.sheets, header=args.headers, days=args.days
+        )
+        size_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+        print(f"Сгенерировано файлов: {len(paths)} x {args.rows} строк ({args.format}, "
+              f"{size_mb:.1f} МБ) за {time.perf_counter() - started:.1f} с")
+
+        specialties = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+        if args.sink == 'postgres':
+            sink = PostgresSink(specialties)
+            await sink.open()
+        else:
+            sink = MemorySink()
+
+        try:
+            await _run_stages(paths, sink, args.engine)
+            if args.sink == 'postgres':
+                await _run_full_import(directory, sink, args.engine, args.workers, args.pipeline)
+        finally:
+            await sink.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help='строк в каждом файле')
+    parser.add_argument('--files', type=int, default=4, help='число файлов (специальностей)')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='xlsx')
+    parser.add_argument('--sheets', type=int, default=1, help='листов в файле (данные читаются с первого)')
+    parser.add_argument('--headers', choices=sorted(HEADER_VARIANTS), default='standard')
+    parser.add_argument('--days', choices=sorted(DAY_STYLES), default='full', help='написание дней недели')
+    parser.add_argument('--engine', choices=EXCEL_PARSER_ENGINES, default=EXCEL_PARSER_ENGINES[0])
+    parser.add_argument('--sink', choices=('memory', 'postgres'), default='memory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='процессов для load_all_excel_files (только postgres)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='load_all_excel_files через потоковый конвейер (только postgres, движок python)')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
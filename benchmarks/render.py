@@ -0,0 +1,114 @@
+"""
+Микро-бенчмарк форматирования списка расписания
+
+Сравнивает на синтетическом списке (по умолчанию 500 записей):
+- concat: прежний format_schedules_list со сборкой текста через +=;
+- join: текущий format_schedules_list (сборка частей одним join);
+- cached: render_schedule при попадании в кэш готовых текстов.
+Тексты concat и join должны совпадать.
+
+Запуск: python -m benchmarks.render --entries 500 --repeat 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from database.db import get_schedule_version
+from database.schedule_keys import schedule_sort_key
+from utils import schedule_render
+from utils.formatters import format_schedules_list
+
+DAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+TIMES = ['08:30-10:00', '10:10-11:40', '12:10-13:40', '13:50-15:20', '15:30-17:00']
+TEACHERS = ['Иванов И.И.', 'Петров П.П.', 'Сидорова А.В.', None]
+
+
+def _format_concat(schedules: list, title: str = "Расписание") -> str:
+    """Прежняя реализация format_schedules_list (для сравнения)"""
+    if not schedules:
+        return f"❌ {title} не найдено"
+
+    text = f"📋 <b>{title}</b>\n\n"
+    current_day = None
+    for schedule in sorted(schedules, key=schedule_sort_key):
+        day = schedule['day_of_week']
+        if day != current_day:
+            text += f"\n📅 <b>{day}</b>\n"
+            current_day = day
+        text += f"🕐 {schedule['time']} - {schedule['subject']}"
+        if schedule.get('room'):
+            text += f" ({schedule['room']})"
+        text += "\n"
+        if schedule.get('teacher'):
+            text += f"   👤 {schedule['teacher']}\n"
+        if schedule.get('group_name'):
+            text += f"   👥 {schedule['group_name']}\n"
+        text += "\n"
+    return text
+
+
+def _generate_schedules(count: int, seed: int = 42) -> list:
+    """Записи в виде строк выборки get_schedules_by_specialty"""
+    rnd = random.Random(seed)
+    schedules = []
+    for i in range(count):
+        day = rnd.randrange(len(DAYS))
+        time_range = rnd.choice(TIMES)
+        start, end = time_range.split('-')
+        schedules.append({
+            'id': i + 1,
+            'day_of_week': DAYS[day],
+            'time': time_range,
+            'subject': f'Предмет {i}',
+            'teacher': rnd.choice(TEACHERS),
+            'room': str(rnd.randint(100, 599)) if rnd.random() < 0.8 else None,
+            'group_name': f'Г-{rnd.randint(1, 40)}' if rnd.random() < 0.5 else None,
+            'weekday': day,
+            'time_start': start,
+            'time_end': end,
+        })
+    return schedules
+
+
+def _measure(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+async def _measure_cached(specialty: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await schedule_render.render_schedule(specialty)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=500, help='записей в списке')
+    parser.add_argument('--repeat', type=int, default=2000, help='повторов на вариант')
+    args = parser.parse_args()
+
+    schedules = _generate_schedules(args.entries)
+    text = format_schedules_list(schedules, "")
+    if _format_concat(schedules, "") != text:
+        raise SystemExit("Тексты concat и join отличаются")
+
+    # Кэш заполняется готовым текстом, чтобы замерить попадание без БД
+    specialty = 'Бенчмарк'
+    schedule_render._render_cache.set((specialty, None, get_schedule_version(specialty), 'list'), text)
+
+    results = {
+        'concat': _measure(lambda: _format_concat(schedules, ""), args.repeat),
+        'join': _measure(lambda: format_schedules_list(schedules, ""), args.repeat),
+        'cached': asyncio.run(_measure_cached(specialty, args.repeat)),
+    }
+    print(f"{args.entries} записей, {len(text)} символов, {args.repeat} повторов")
+    for name, seconds in results.items():
+        print(f"{name:>7}: {seconds * 1e6:10.1f} мкс на текст")
+
+
+if __name__ == '__main__':
+    main()
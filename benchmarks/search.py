@@ -0,0 +1,162 @@
+"""
+Бенчмарк поиска по расписанию: LIKE против pg_trgm
+
+Создает отдельную схему search_bench с синтетической таблицей schedules
+(по умолчанию 1 000 000 строк) и сравнивает режимы search_schedules:
+- like без индексов (как при недоступном pg_trgm);
+- like с триграммными индексами;
+- trgm (ранжированный поиск с ограничением результатов).
+
+Запуск: python -m benchmarks.search --rows 1000000 --repeat 20
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import asyncpg
+
+from database.db_postgresql import (
+    get_pool, close_pool, _search_like, _search_trgm, _with_sort_keys, SCHEDULE_COPY_COLUMNS
+)
+
+SCHEMA = 'search_bench'
+
+SUBJECTS = [
+    'Математический анализ', 'Линейная алгебра', 'Физика', 'Химия', 'История России',
+    'Философия', 'Иностранный язык', 'Программирование', 'Базы данных', 'Экономика',
+    'Теория вероятностей', 'Дискретная математика', 'Физическая культура', 'Сети ЭВМ',
+    'Операционные системы', 'Правоведение', 'Социология', 'Компьютерная графика',
+]
+TEACHERS = [
+    'Иванов И.И.', 'Петров П.П.', 'Сидорова А.В.', 'Кузнецов Д.С.', 'Смирнова Е.А.',
+    'Попов В.Н.', 'Васильева О.Г.', 'Новиков Р.М.', 'Морозова Т.К.', 'Волков С.Л.',
+]
+DAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+TIMES = ['08:30-10:00', '10:10-11:40', '12:10-13:40', '13:50-15:20', '15:30-17:00']
+
+QUERIES = ['матем', 'иванов', 'физ', 'базы данных', 'матиматика', 'смирнова']
+
+
+def _generate_rows(count: int, seed: int = 42):
+    """Синтетические строки расписания в порядке колонок COPY"""
+    rnd = random.Random(seed)
+    for i in range(count):
+        yield _with_sort_keys((
+            f'Специальность {i % 300:03d}',
+            f'Семестр {rnd.randint(1, 8)}',
+            rnd.choice(DAYS),
+            rnd.choice(TIMES),
+            f'{rnd.choice(SUBJECTS)} {rnd.randint(1, 99)}',
+            rnd.choice(TEACHERS),
+            str(rnd.randint(100, 599)),
+            f'Г-{rnd.randint(1, 40)}',
+        ))
+
+
+async def _prepare_table(conn, rows: int, chunk: int = 50000):
+    await conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    await conn.execute(f'CREATE SCHEMA {SCHEMA}')
+    await conn.execute(f'SET search_path TO {SCHEMA}, public')
+    await conn.execute('''
+        CREATE TABLE schedules (
+            id SERIAL PRIMARY KEY,
+            specialty VARCHAR(255) NOT NULL,
+            semester VARCHAR(50),
+            day_of_week VARCHAR(20) NOT NULL,
+            time VARCHAR(20) NOT NULL,
+            subject VARCHAR(255) NOT NULL,
+            teacher VARCHAR(255),
+            room VARCHAR(50),
+            group_name VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            weekday SMALLINT,
+            time_start TIME,
+            time_end TIME
+        )
+    ''')
+
+    columns = SCHEDULE_COPY_COLUMNS
+    batch = []
+    for record in _generate_rows(rows):
+        batch.append(record)
+        if len(batch) >= chunk:
+            await conn.copy_records_to_table('schedules', records=batch, columns=columns)
+            batch = []
+    if batch:
+        await conn.copy_records_to_table('schedules', records=batch, columns=columns)
+    await conn.execute('ANALYZE schedules')
+
+
+async def _create_trgm_indexes(conn):
+    # Явно в public: иначе расширение создалось бы в тестовой схеме (первой в
+    # search_path) и было бы удалено вместе с ней через DROP SCHEMA ... CASCADE
+    await conn.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public')
+    await conn.execute('CREATE INDEX ON schedules USING GIN (LOWER(subject) gin_trgm_ops)')
+    await conn.execute('CREATE INDEX ON schedules USING GIN (LOWER(teacher) gin_trgm_ops)')
+    await conn.execute('ANALYZE schedules')
+
+
+async def _measure(conn, search, repeat: int, limit):
+    """Время выполнения каждого запроса (мс) и число найденных строк"""
+    results = {}
+    for query in QUERIES:
+        timings = []
+        found = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = await search(conn, query, None, limit)
+            timings.append((time.perf_counter() - started) * 1000)
+            found = len(rows)
+        timings.sort()
+        results[query] = (
+            statistics.median(timings),
+            timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+            found,
+        )
+    return results
+
+
+def _print_results(title: str, results: dict):
+    print(f'\n{title}')
+    print(f'{"запрос":<16}{"медиана, мс":>14}{"p95, мс":>12}{"строк":>10}')
+    for query, (median, p95, found) in results.items():
+        print(f'{query:<16}{median:>14.1f}{p95:>12.1f}{found:>10}')
+
+
+async def main(rows: int, repeat: int, limit: int, keep: bool):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        try:
+            print(f'Подготовка {rows} строк в схеме {SCHEMA}...')
+            started = time.perf_counter()
+            await _prepare_table(conn, rows)
+            print(f'Загружено за {time.perf_counter() - started:.1f} с')
+
+            # Без индексов LIMIT не ограничиваем, как в старом поиске
+            _print_results('like (без индексов)', await _measure(conn, _search_like, repeat, None))
+
+            started = time.perf_counter()
+            try:
+                await _create_trgm_indexes(conn)
+            except asyncpg.exceptions.PostgresError as e:
+                print(f'\npg_trgm недоступен, сравнение пропущено: {e}')
+            else:
+                print(f'\nТриграммные индексы построены за {time.perf_counter() - started:.1f} с')
+                _print_results(f'like (GIN pg_trgm, LIMIT {limit})', await _measure(conn, _search_like, repeat, limit))
+                _print_results(f'trgm (ранжирование, LIMIT {limit})', await _measure(conn, _search_trgm, repeat, limit))
+        finally:
+            if not keep:
+                await conn.execute(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE')
+    await close_pool()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сравнение режимов поиска по расписанию')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='число строк в тестовой таблице')
+    parser.add_argument('--repeat', type=int, default=20, help='повторов каждого запроса')
+    parser.add_argument('--limit', type=int, default=50, help='ограничение числа результатов')
+    parser.add_argument('--keep', action='store_true', help='не удалять схему после запуска')
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat, args.limit, args.keep))
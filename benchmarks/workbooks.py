@@ -0,0 +1,121 @@
+"""
+Генератор синтетических файлов расписания .xlsx и .xls для бенчмарков
+
+Файлы похожи на настоящие: строка названия и пустая строка перед
+заголовками, пустые строки между блоками, кириллические дни недели
+в разных написаниях и несколько вариантов заголовков.
+"""
+import os
+import random
+from typing import Iterator, List
+
+from openpyxl import Workbook
+
+# Варианты заголовков: (поле записи, заголовок колонки) в порядке колонок
+HEADER_VARIANTS = {
+    'standard': [
+        ('day', 'День'), ('time', 'Время'), ('subject', 'Предмет'),
+        ('teacher', 'Преподаватель'), ('room', 'Аудитория'), ('group', 'Группа'),
+    ],
+    'synonyms': [
+        ('day', 'День недели'), ('time', 'Часы'), ('subject', 'Дисциплина'),
+        ('teacher', 'Преп.'), ('room', 'Кабинет'), ('group', 'Группа'),
+    ],
+    'shuffled': [
+        ('group', 'Группа'), ('subject', 'Предмет'), ('day', 'День'),
+        ('room', 'Аудитория'), ('time', 'Время'), ('teacher', 'Преподаватель'),
+    ],
+}
+
+# Написания дней недели
+DAY_STYLES = {
+    'full': ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота'],
+    'short': ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб'],
+    'upper': ['ПОНЕДЕЛЬНИК', 'ВТОРНИК', 'СРЕДА', 'ЧЕТВЕРГ', 'ПЯТНИЦА', 'СУББОТА'],
+}
+
+TIMES = ['08:30-10:00', '10:10-11:40', '12:10-13:40', '13:50-15:20', '15:30-17:00', '17:10-18:40']
+SUBJECTS = [
+    'Математический анализ', 'Линейная алгебра', 'Физика', 'Химия', 'История России',
+    'Философия', 'Иностранный язык', 'Программирование', 'Базы данных', 'Экономика',
+]
+TEACHERS = ['Иванов И.И.', 'Петров П.П.', 'Сидорова А.В.', 'Кузнецов Д.С.', 'Смирнова Е.А.', '']
+
+# Максимум строк на лист в формате .xls
+XLS_MAX_ROWS = 65536
+
+# Пустая строка между блоками занятий через каждые BLOCK_SIZE строк
+BLOCK_SIZE = 40
+
+
+def generate_rows(rows: int, header: str = 'standard', days: str = 'full',
+                  seed: int = 42) -> Iterator[List]:
+    """Строки листа: название, пустая строка, заголовки и rows строк занятий"""
+    rnd = random.Random(seed)
+    columns = HEADER_VARIANTS[header]
+    day_names = DAY_STYLES[days]
+
+    yield ['Расписание занятий']
+    yield []
+    yield [title for _, title in columns]
+    for i in range(rows):
+        if i and i % BLOCK_SIZE == 0:
+            yield []
+        values = {
+            'day': rnd.choice(day_names),
+            'time': rnd.choice(TIMES),
+            'subject': f'{rnd.choice(SUBJECTS)} {i % 97}',
+            'teacher': rnd.choice(TEACHERS),
+            'room': str(rnd.randint(100, 599)),
+            'group': f'Г-{rnd.randint(1, 40)}',
+        }
+        yield [values[field] for field, _ in columns]
+
+
+def write_xlsx(path: str, rows: int, sheets: int = 1, header: str = 'standard',
+               days: str = 'full', seed: int = 42):
+    """Записать .xlsx: расписание на первом листе, копии на остальных"""
+    wb = Workbook(write_only=True)
+    for sheet in range(sheets):
+        ws = wb.create_sheet(f'Лист{sheet + 1}')
+        for row in generate_rows(rows, header, days, seed):
+            ws.append(row)
+    wb.save(path)
+
+
+def write_xls(path: str, rows: int, sheets: int = 1, header: str = 'standard',
+              days: str = 'full', seed: int = 42):
+    """Записать .xls (нужен пакет xlwt)"""
+    try:
+        import xlwt
+    except ImportError:
+        raise RuntimeError("Для генерации .xls установите xlwt: pip install xlwt")
+
+    wb = xlwt.Workbook(encoding='utf-8')
+    for sheet in range(sheets):
+        ws = wb.add_sheet(f'Лист{sheet + 1}')
+        for row_idx, row in enumerate(generate_rows(rows, header, days, seed)):
+            if row_idx >= XLS_MAX_ROWS:
+                raise ValueError(f"В .xls помещается не больше {XLS_MAX_ROWS} строк на лист")
+            for col_idx, value in enumerate(row):
+                ws.write(row_idx, col_idx, value)
+    wb.save(path)
+
+
+WRITERS = {'xlsx': write_xlsx, 'xls': write_xls}
+
+
+def generate_dataset(directory: str, files: int, rows: int, fmt: str = 'xlsx',
+                     prefix: str = 'bench', **options) -> List[str]:
+    """Создать files файлов по rows строк в directory
+
+    Имя файла (без расширения) - название специальности: {prefix}-000 и т.д.
+    options передаются в write_xlsx / write_xls.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f'{prefix}-{i:03d}.{fmt}')
+        WRITERS[fmt](path, rows, seed=i, **options)
+        paths.append(path)
+    return paths
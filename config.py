@@ -23,12 +23,61 @@ POSTGRES_DATABASE = os.getenv('POSTGRES_DATABASE', 'schedule_db')
 POSTGRES_USER = os.getenv('POSTGRES_USER', os.getenv('USER', 'postgres'))
 POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD', '')  # На macOS обычно пароль не требуется
 
+# Параметры пула соединений PostgreSQL
+POSTGRES_POOL_MIN_SIZE = int(os.getenv('POSTGRES_POOL_MIN_SIZE', '2'))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10'))
+# Число запросов, после которого соединение пересоздается
+POSTGRES_POOL_MAX_QUERIES = int(os.getenv('POSTGRES_POOL_MAX_QUERIES', '50000'))
+# Время (с), после которого неиспользуемое соединение закрывается
+POSTGRES_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv('POSTGRES_POOL_MAX_INACTIVE_LIFETIME', '300'))
+# Таймаут выполнения запроса (с)
+POSTGRES_COMMAND_TIMEOUT = float(os.getenv('POSTGRES_COMMAND_TIMEOUT', '30'))
+# Таймаут ожидания свободного соединения из пула (с)
+POSTGRES_ACQUIRE_TIMEOUT = float(os.getenv('POSTGRES_ACQUIRE_TIMEOUT', '10'))
+# Интервал (с) записи метрик пула в лог, 0 - не записывать
+POOL_STATS_LOG_INTERVAL = int(os.getenv('POOL_STATS_LOG_INTERVAL', '300'))
+# Файл, в который бот публикует метрики пула с тем же интервалом (читает API)
+POOL_STATS_PATH = os.getenv('POOL_STATS_PATH', 'pool_stats.json')
+# Сколько самых затратных подготовленных запросов выводить в лог вместе с метриками пула
+STATEMENT_STATS_LOG_TOP = int(os.getenv('STATEMENT_STATS_LOG_TOP', '5'))
+
 # Строка подключения к PostgreSQL
 POSTGRES_CONNECTION_STRING = (
     f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
     f"{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DATABASE}"
 )
 
+# Кэш профилей пользователей (количество записей и время жизни в секундах)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '300'))
+
+# Кэш выборок расписания (максимальное суммарное число строк в памяти)
+SCHEDULE_CACHE_MAX_ROWS = int(os.getenv('SCHEDULE_CACHE_MAX_ROWS', '50000'))
+
+# Кэш готовых текстов расписания (количество текстов и время жизни в секундах)
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '2000'))
+RENDER_CACHE_TTL = float(os.getenv('RENDER_CACHE_TTL', '3600'))
+
+# Кэш индексов страниц длинных сообщений по (чат, сообщение): количество и время жизни (с)
+PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', '5000'))
+PAGE_CACHE_TTL = float(os.getenv('PAGE_CACHE_TTL', '3600'))
+
+# Картинки расписания на неделю: папка дискового кэша PNG (там же file_id
+# загруженных в Telegram картинок), максимум файлов в ней и шрифт TrueType
+# с кириллицей (пусто - DejaVuSans или Arial из системных шрифтов)
+SCHEDULE_IMAGE_CACHE_DIR = os.getenv('SCHEDULE_IMAGE_CACHE_DIR', 'schedule_images')
+SCHEDULE_IMAGE_CACHE_MAX_FILES = int(os.getenv('SCHEDULE_IMAGE_CACHE_MAX_FILES', '1000'))
+SCHEDULE_IMAGE_FONT = os.getenv('SCHEDULE_IMAGE_FONT', '')
+
+# Количество специальностей на странице клавиатуры выбора специальности
+SPECIALTY_KEYBOARD_PAGE_SIZE = int(os.getenv('SPECIALTY_KEYBOARD_PAGE_SIZE', '20'))
+
+# Максимальное число результатов поиска по расписанию
+SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', '50'))
+
+# Количество записей на странице просмотра всех расписаний
+VIEW_ALL_PAGE_SIZE = int(os.getenv('VIEW_ALL_PAGE_SIZE', '20'))
+
 # Настройки SQL Server (для обратной совместимости)
 SQL_SERVER_HOST = os.getenv('SQL_SERVER_HOST', 'localhost')
 SQL_SERVER_PORT = os.getenv('SQL_SERVER_PORT', '1433')
@@ -47,6 +96,40 @@ SQL_SERVER_CONNECTION_STRING = (
 EXCEL_FOLDER_1 = '1'
 EXCEL_FOLDER_2 = '2'
 
+# Размер пачки записей при массовой загрузке расписания из Excel
+EXCEL_IMPORT_BATCH_SIZE = int(os.getenv('EXCEL_IMPORT_BATCH_SIZE', '500'))
+
+# Число процессов для параллельного разбора Excel файлов (по умолчанию - число ядер)
+EXCEL_IMPORT_WORKERS = int(os.getenv('EXCEL_IMPORT_WORKERS', str(os.cpu_count() or 1)))
+
+# Движок разбора Excel: python (потоковый, по строкам) или pandas (векторизованный)
+EXCEL_PARSER_ENGINE = os.getenv('EXCEL_PARSER_ENGINE', 'python')
+
+# Режим записи импорта: diff (только изменения, id записей сохраняются)
+# или replace (замена расписания специальности целиком через временную таблицу)
+EXCEL_IMPORT_MODE = os.getenv('EXCEL_IMPORT_MODE', 'diff')
+
+# Потоковый импорт через конвейер чтение -> нормализация -> проверка -> запись
+# в процессе бота с ограниченной памятью (1 - включен, см. utils/import_pipeline.py).
+# По умолчанию файлы разбираются в пуле процессов: быстрее на многоядерных
+# машинах, но все записи специальности держатся в памяти
+EXCEL_IMPORT_PIPELINE = os.getenv('EXCEL_IMPORT_PIPELINE', '0') == '1'
+# Емкость очередей между этапами конвейера (в пачках записей)
+EXCEL_IMPORT_QUEUE_SIZE = int(os.getenv('EXCEL_IMPORT_QUEUE_SIZE', '4'))
+# Максимальный интервал (с) между записями пачек в БД
+EXCEL_IMPORT_FLUSH_INTERVAL = float(os.getenv('EXCEL_IMPORT_FLUSH_INTERVAL', '1'))
+
+# Файл кэша макетов Excel (строка заголовков и колонки по сигнатуре заголовков)
+EXCEL_LAYOUT_CACHE_PATH = os.getenv('EXCEL_LAYOUT_CACHE_PATH', 'excel_layouts.json')
+# Файл ручных макетов для нестандартных шаблонов (см. utils/excel_layout.py)
+EXCEL_LAYOUT_OVERRIDES_PATH = os.getenv('EXCEL_LAYOUT_OVERRIDES_PATH', 'excel_layout_overrides.json')
+
+# Максимальный размер Excel файла, присланного боту (Bot API скачивает не больше 20 МБ)
+EXCEL_UPLOAD_MAX_SIZE = int(os.getenv('EXCEL_UPLOAD_MAX_SIZE', str(20 * 1024 * 1024)))
+
+# Интервал (с) обновления сообщения с прогрессом импорта
+IMPORT_PROGRESS_INTERVAL = float(os.getenv('IMPORT_PROGRESS_INTERVAL', '3'))
+
 # Настройки API для desktop приложения
 API_HOST = os.getenv('API_HOST', 'localhost')
 API_PORT = int(os.getenv('API_PORT', '8000'))
@@ -0,0 +1,152 @@
+"""
+Внутрипроцессные кэши для слоя работы с БД
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Ограниченный по размеру кэш с временем жизни записей и вытеснением LRU"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение или None, если записи нет или она устарела"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Получить значение без учета в статистике и без продления LRU"""
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Сохранить значение"""
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Удалить запись"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Очистить кэш"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class VersionedCache:
+    """Кэш выборок, привязанных к версии данных
+
+    Запись считается актуальной, пока версия, с которой она была сохранена,
+    совпадает с текущей. Объем ограничен суммарным числом строк во всех
+    записях (пустая выборка считается за одну строку), при превышении
+    вытесняются давно не использованные записи.
+    """
+
+    def __init__(self, max_rows: int = 50000):
+        self.max_rows = max_rows
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """Получить строки, если они сохранены с той же версией"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        cached_version, rows = item
+        if cached_version != version:
+            self._remove(key)
+            self.stale += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return rows
+
+    def set(self, key: Hashable, version: int, rows: list):
+        """Сохранить строки для версии"""
+        if len(rows) + 1 > self.max_rows:
+            return
+        self._remove(key)
+        self._data[key] = (version, rows)
+        self._rows += len(rows) + 1
+        while self._rows > self.max_rows and self._data:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._rows -= len(item[1]) + 1
+
+    def clear(self):
+        """Очистить кэш"""
+        self._data.clear()
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий, промахов и объема"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'rows': self._rows,
+            'max_rows': self.max_rows,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -7,21 +7,41 @@ from database.db_postgresql import (
     init_db,
     get_user,
     add_user,
+    get_or_create_user_context,
     update_user_specialty,
     update_user_group,
+    get_user_cache_stats,
     add_specialty,
     get_all_specialties,
     get_specialty_by_id,
     get_specialty_by_name_hash,
+    get_specialty_catalog,
+    invalidate_specialty_catalog,
     add_schedule,
+    add_schedules_bulk,
+    SCHEDULE_RECORD_COLUMNS,
+    schedule_import_transaction,
+    get_import_ledger,
+    sync_specialty_schedules,
+    replace_specialty_schedules,
+    schedule_staging,
+    copy_to_staging,
+    swap_staging,
+    sync_staging,
     get_schedules_by_specialty,
+    get_schedule_version,
+    bump_schedule_version,
+    get_schedule_cache_stats,
     search_schedules,
     get_all_schedules,
+    get_schedules_page,
     delete_schedule,
     get_schedule_by_id,
     update_schedule,
-    close_pool
+    close_pool,
+    get_pool_stats
 )
+from database.statements import get_statement_stats
 
 # Для обратной совместимости, если нужен SQLite, создайте database/db_sqlite.py
 
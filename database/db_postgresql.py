@@ -1,19 +1,54 @@
 """
 Модуль для работы с PostgreSQL базой данных
 """
+import asyncio
 import asyncpg
 import logging
-from typing import Optional, List, Dict
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional, List, Dict, Iterable, Sequence, Tuple
 from config import (
     POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DATABASE,
-    POSTGRES_USER, POSTGRES_PASSWORD
+    POSTGRES_USER, POSTGRES_PASSWORD,
+    POSTGRES_POOL_MIN_SIZE, POSTGRES_POOL_MAX_SIZE, POSTGRES_POOL_MAX_QUERIES,
+    POSTGRES_POOL_MAX_INACTIVE_LIFETIME, POSTGRES_COMMAND_TIMEOUT, POSTGRES_ACQUIRE_TIMEOUT,
+    USER_CACHE_SIZE, USER_CACHE_TTL, SCHEDULE_CACHE_MAX_ROWS,
+    SEARCH_RESULT_LIMIT, EXCEL_IMPORT_BATCH_SIZE
 )
+from database.cache import TTLCache, VersionedCache
+from database.migrator import migrate
+from database.pool_metrics import PoolMetrics
+from database.schedule_diff import diff_schedules
+from database.schedule_keys import WEEKDAYS, parse_weekday, parse_time_range, schedule_sort_keys
+from database.statements import prepare_statements, run
 
 logger = logging.getLogger(__name__)
 
 # Глобальный пул соединений
 _pool: Optional[asyncpg.Pool] = None
 
+# Метрики ожидания соединений пула
+_pool_metrics = PoolMetrics()
+
+# Кэш профилей пользователей (user_id -> dict)
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+# Кэш выборок расписания ((specialty, day) -> строки) и версии данных по специальностям
+_schedule_cache = VersionedCache(max_rows=SCHEDULE_CACHE_MAX_ROWS)
+_schedule_versions: Dict[str, int] = {}
+# Число сбросов версий всех специальностей (входит в версию каждой специальности)
+_schedule_epoch = 0
+# Общее число изменений версий - позволяет понять, не было ли записи во время запроса
+_schedule_bumps = 0
+
+# Каталог специальностей (см. get_specialty_catalog) и номер его версии
+_specialty_catalog: Optional[Dict] = None
+_specialty_catalog_version = 0
+
+# Установлен ли pg_trgm (определяется в init_db)
+_trgm_available = False
+
 
 async def get_pool() -> asyncpg.Pool:
     """Получить пул соединений с БД"""
@@ -23,8 +58,13 @@ async def get_pool() -> asyncpg.Pool:
         pool_kwargs = {
             'database': POSTGRES_DATABASE,
             'user': POSTGRES_USER,
-            'min_size': 2,
-            'max_size': 10
+            'min_size': POSTGRES_POOL_MIN_SIZE,
+            'max_size': POSTGRES_POOL_MAX_SIZE,
+            'max_queries': POSTGRES_POOL_MAX_QUERIES,
+            'max_inactive_connection_lifetime': POSTGRES_POOL_MAX_INACTIVE_LIFETIME,
+            'command_timeout': POSTGRES_COMMAND_TIMEOUT,
+            # Подготовка часто выполняемых запросов на каждом новом соединении
+            'init': prepare_statements
         }
         
         # Если пароль указан, добавляем его
@@ -53,6 +93,30 @@ async def get_pool() -> asyncpg.Pool:
     return _pool
 
 
+@asynccontextmanager
+async def acquire():
+    """Получить соединение из пула с учетом времени ожидания в метриках"""
+    pool = await get_pool()
+    started = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=POSTGRES_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _pool_metrics.record_timeout()
+        logger.warning(f"Таймаут ожидания соединения с БД ({POSTGRES_ACQUIRE_TIMEOUT} с)")
+        raise
+    _pool_metrics.record_acquire(time.perf_counter() - started)
+    try:
+        yield conn
+    finally:
+        _pool_metrics.record_release()
+        await pool.release(conn)
+
+
+def get_pool_stats() -> Dict:
+    """Метрики пула: гистограмма ожидания, занятые/свободные соединения, таймауты"""
+    return _pool_metrics.snapshot(_pool)
+
+
 async def close_pool():
     """Закрыть пул соединений"""
     global _pool
@@ -62,7 +126,11 @@ async def close_pool():
 
 
 async def init_db():
-    """Инициализация базы данных и создание таблиц"""
+    """Инициализация базы данных: применение миграций схемы
+
+    Если схема уже актуальна, DDL не выполняется.
+    """
+    global _trgm_available
     try:
         pool = await get_pool()
     except Exception as e:
@@ -70,201 +138,646 @@ async def init_db():
         logger.error(f"Детали ошибки: {e}")
         raise
     
-    async with pool.acquire() as conn:
-        # Таблица пользователей
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id BIGINT PRIMARY KEY,
-                role VARCHAR(20) NOT NULL DEFAULT 'student',
-                specialty VARCHAR(255),
-                user_group VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Добавляем колонку user_group если её нет (для существующих БД)
-        try:
-            await conn.execute('ALTER TABLE users ADD COLUMN user_group VARCHAR(50)')
-        except asyncpg.exceptions.DuplicateColumnError:
-            pass  # Колонка уже существует
-        
-        # Таблица специальностей
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS specialties (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL UNIQUE,
-                code VARCHAR(50)
-            )
-        ''')
-        
-        # Таблица расписания
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS schedules (
-                id SERIAL PRIMARY KEY,
-                specialty VARCHAR(255) NOT NULL,
-                semester VARCHAR(50),
-                day_of_week VARCHAR(20) NOT NULL,
-                time VARCHAR(20) NOT NULL,
-                subject VARCHAR(255) NOT NULL,
-                teacher VARCHAR(255),
-                room VARCHAR(50),
-                group_name VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        logger.info("База данных PostgreSQL инициализирована успешно")
+    async with acquire() as conn:
+        previous_version, version = await migrate(conn)
+        _trgm_available = await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+        )
+        if not _trgm_available:
+            logger.warning("pg_trgm недоступен, поиск будет выполняться через LIKE")
+    
+    if version != previous_version:
+        # Соединения пула подготовили запросы до миграции - пересоздаем их
+        await pool.expire_connections()
+    
+    logger.info(f"База данных PostgreSQL инициализирована успешно (версия схемы {version})")
+
+
+def _patch_cached_user(user_id: int, **fields):
+    """Сквозная запись изменений профиля в кэш"""
+    cached = _user_cache.peek(user_id)
+    if cached is not None:
+        _user_cache.set(user_id, {**cached, **fields})
+
+
+def get_user_cache_stats() -> Dict:
+    """Статистика кэша пользователей (попадания, промахи, размер)"""
+    return _user_cache.stats()
 
 
 async def get_user(user_id: int) -> Optional[Dict]:
     """Получить информацию о пользователе"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            'SELECT * FROM users WHERE user_id = $1', user_id
-        )
-        return dict(row) if row else None
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+    
+    async with acquire() as conn:
+        row = await run(conn, 'fetchrow', 'get_user', user_id)
+    if not row:
+        return None
+    
+    user = dict(row)
+    _user_cache.set(user_id, user)
+    return dict(user)
+
+
+async def get_or_create_user_context(user_id: int, role: str = 'student', weekday: int = None) -> Dict:
+    """Пользователь и его расписание на день одним запросом
+
+    Если пользователя нет, он создается с указанной ролью. weekday - номер
+    дня недели (0 - понедельник), по умолчанию сегодняшний.
+    Возвращает {'user': dict, 'created': bool, 'weekday': int, 'schedules': [...]}.
+    Результат берется из кэшей, если там есть и пользователь, и его расписание.
+    """
+    if weekday is None:
+        weekday = datetime.now().weekday()
+    day = WEEKDAYS[weekday]
+    
+    user = _user_cache.get(user_id)
+    if user is not None:
+        specialty = user.get('specialty')
+        schedules = []
+        if specialty:
+            schedules = _schedule_cache.get((specialty, day), get_schedule_version(specialty))
+        if schedules is not None:
+            return {'user': dict(user), 'created': False, 'weekday': weekday, 'schedules': list(schedules)}
+    
+    bumps_before = _schedule_bumps
+    async with acquire() as conn:
+        row = await run(conn, 'fetchrow', 'get_or_create_user_context', user_id, role, weekday)
+        if row is None:
+            # Пользователя одновременно создал другой запрос: вставка пропущена по
+            # конфликту, а его строка не видна в снимке этого запроса. Повтор
+            # выполняется с новым снимком и находит ее
+            row = await run(conn, 'fetchrow', 'get_or_create_user_context', user_id, role, weekday)
+
+    user = {k: v for k, v in row.items() if k not in ('created', 'schedules')}
+    schedules = [dict(schedule) for schedule in row['schedules'] or []]
+    _user_cache.set(user_id, user)
+    
+    specialty = user.get('specialty')
+    # Если во время запроса расписание менялось, результат может быть устаревшим
+    if specialty and bumps_before == _schedule_bumps:
+        _schedule_cache.set((specialty, day), get_schedule_version(specialty), schedules)
+    
+    return {'user': dict(user), 'created': row['created'], 'weekday': weekday, 'schedules': list(schedules)}
 
 
 async def add_user(user_id: int, role: str = 'student', specialty: str = None, user_group: str = None):
     """Добавить пользователя"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            '''INSERT INTO users (user_id, role, specialty, user_group) 
-               VALUES ($1, $2, $3, $4)
-               ON CONFLICT (user_id) DO NOTHING''',
-            user_id, role, specialty, user_group
-        )
+    async with acquire() as conn:
+        await run(conn, 'execute', 'add_user', user_id, role, specialty, user_group)
+    # Пользователь мог уже существовать, поэтому просто сбрасываем запись
+    _user_cache.invalidate(user_id)
 
 
 async def update_user_specialty(user_id: int, specialty: str):
     """Обновить специальность пользователя"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            'UPDATE users SET specialty = $1 WHERE user_id = $2',
-            specialty, user_id
-        )
+    async with acquire() as conn:
+        await run(conn, 'execute', 'update_user_specialty', specialty, user_id)
+    _patch_cached_user(user_id, specialty=specialty)
 
 
 async def update_user_group(user_id: int, user_group: str):
     """Обновить группу пользователя"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            'UPDATE users SET user_group = $1 WHERE user_id = $2',
-            user_group, user_id
-        )
+    async with acquire() as conn:
+        await run(conn, 'execute', 'update_user_group', user_group, user_id)
+    _patch_cached_user(user_id, user_group=user_group)
+
+
+def invalidate_specialty_catalog():
+    """Сбросить каталог специальностей (после изменения таблицы specialties)"""
+    global _specialty_catalog, _specialty_catalog_version
+    _specialty_catalog = None
+    _specialty_catalog_version += 1
+
+
+async def get_specialty_catalog() -> Dict:
+    """Каталог специальностей в памяти
+
+    Загружается одним запросом при первом обращении (при запуске бота)
+    и сбрасывается add_specialty. Возвращает {'version': номер версии,
+    'specialties': [...] по названию, 'by_id': {id: специальность},
+    'by_name': {название: id}}. Каталог общий - его нельзя изменять.
+    """
+    global _specialty_catalog
+    catalog = _specialty_catalog
+    if catalog is not None:
+        return catalog
+
+    version = _specialty_catalog_version
+    async with acquire() as conn:
+        rows = await run(conn, 'fetch', 'get_all_specialties')
+    specialties = [dict(row) for row in rows]
+    catalog = {
+        'version': version,
+        'specialties': specialties,
+        'by_id': {spec['id']: spec for spec in specialties},
+        'by_name': {spec['name']: spec['id'] for spec in specialties},
+    }
+    # Если во время запроса каталог сбрасывался, результат может быть устаревшим
+    if version == _specialty_catalog_version:
+        _specialty_catalog = catalog
+    return catalog
 
 
 async def add_specialty(name: str, code: str = None):
     """Добавить специальность"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            '''INSERT INTO specialties (name, code) 
-               VALUES ($1, $2)
-               ON CONFLICT (name) DO NOTHING''',
-            name, code
-        )
+    async with acquire() as conn:
+        status = await run(conn, 'execute', 'add_specialty', name, code)
+    # Существующая специальность не меняется (ON CONFLICT DO NOTHING)
+    if status.endswith(' 1'):
+        invalidate_specialty_catalog()
 
 
 async def get_all_specialties() -> List[Dict]:
-    """Получить все специальности"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch('SELECT * FROM specialties ORDER BY name')
-        return [dict(row) for row in rows]
+    """Получить все специальности (из каталога, записи нельзя изменять)"""
+    return list((await get_specialty_catalog())['specialties'])
 
 
 async def get_specialty_by_id(spec_id: int) -> Optional[Dict]:
     """Получить специальность по ID"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow('SELECT * FROM specialties WHERE id = $1', spec_id)
-        return dict(row) if row else None
+    spec = (await get_specialty_catalog())['by_id'].get(spec_id)
+    return dict(spec) if spec else None
 
 
 async def get_specialty_by_name_hash(name: str) -> Optional[Dict]:
     """Получить специальность по названию (fallback)"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow('SELECT * FROM specialties WHERE name = $1', name)
-        return dict(row) if row else None
+    catalog = await get_specialty_catalog()
+    spec_id = catalog['by_name'].get(name)
+    return dict(catalog['by_id'][spec_id]) if spec_id is not None else None
 
 
 async def add_schedule(specialty: str, day_of_week: str, time: str, subject: str,
                       teacher: str = None, room: str = None, group_name: str = None, semester: str = None):
     """Добавить запись в расписание"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    weekday, time_start, time_end = schedule_sort_keys(day_of_week, time)
+    async with acquire() as conn:
+        await run(
+            conn, 'execute', 'add_schedule',
+            specialty, semester, day_of_week, time, subject, teacher, room, group_name,
+            weekday, time_start, time_end
+        )
+    bump_schedule_version(specialty)
+
+
+# Порядок полей записи расписания для массовой загрузки
+SCHEDULE_RECORD_COLUMNS = (
+    'specialty', 'semester', 'day_of_week', 'time',
+    'subject', 'teacher', 'room', 'group_name'
+)
+
+# Колонки COPY: поля записи и вычисляемые при записи ключи сортировки
+SCHEDULE_COPY_COLUMNS = SCHEDULE_RECORD_COLUMNS + ('weekday', 'time_start', 'time_end')
+
+
+def _with_sort_keys(record: Sequence) -> tuple:
+    """Дополнить запись значениями weekday, time_start, time_end
+
+    Записи, в которых ключи уже вычислены (см. utils.excel_pandas), не меняются.
+    """
+    if len(record) == len(SCHEDULE_COPY_COLUMNS):
+        return tuple(record)
+    return tuple(record) + schedule_sort_keys(record[2], record[3])
+
+
+@asynccontextmanager
+async def schedule_import_transaction():
+    """Соединение с открытой транзакцией для импорта одного файла"""
+    async with acquire() as conn:
+        async with conn.transaction():
+            yield conn
+
+
+async def add_schedules_bulk(records: Iterable[Sequence], conn: asyncpg.Connection = None) -> int:
+    """Массовое добавление записей расписания через COPY
+
+    records - кортежи в порядке SCHEDULE_RECORD_COLUMNS.
+    Если передано соединение conn, запись выполняется в его транзакции
+    (см. schedule_import_transaction), иначе - в отдельной транзакции.
+    Во втором случае версии специальностей сбрасываются автоматически,
+    в первом это делает вызывающий код после фиксации транзакции.
+    """
+    records = [_with_sort_keys(record) for record in records]
+    if not records:
+        return 0
+
+    if conn is not None:
+        await conn.copy_records_to_table(
+            'schedules', records=records, columns=SCHEDULE_COPY_COLUMNS
+        )
+        return len(records)
+
+    async with schedule_import_transaction() as conn:
+        await conn.copy_records_to_table(
+            'schedules', records=records, columns=SCHEDULE_COPY_COLUMNS
+        )
+    for specialty in {record[0] for record in records}:
+        bump_schedule_version(specialty)
+    return len(records)
+
+
+async def get_import_ledger() -> Dict[str, Dict]:
+    """Журнал импорта: путь к файлу -> запись (специальность, хэш, число строк)"""
+    async with acquire() as conn:
+        rows = await run(conn, 'fetch', 'get_import_ledger')
+    return {row['file_path']: dict(row) for row in rows}
+
+
+async def _record_import_ledger(conn: asyncpg.Connection, specialty: str,
+                                files: Sequence[Tuple[str, str, int]]):
+    """Записать файлы специальности в журнал импорта (в транзакции conn)"""
+    await run(conn, 'executemany', 'upsert_import_ledger', [
+        (file_path, specialty, content_hash, row_count)
+        for file_path, content_hash, row_count in files
+    ])
+    await run(conn, 'execute', 'delete_stale_import_ledger',
+              specialty, [file_path for file_path, _, _ in files])
+
+
+async def sync_specialty_schedules(specialty: str, records: Iterable[Sequence],
+                                   files: Sequence[Tuple[str, str, int]]) -> Dict[str, int]:
+    """Привести расписание специальности к записям из ее файлов
+
+    records - все записи файлов специальности в порядке SCHEDULE_RECORD_COLUMNS,
+    files - (путь, хэш содержимого, число записей) для журнала импорта.
+    Применяются только отличия от текущих данных (см. diff_schedules),
+    журнал обновляется в той же транзакции.
+    Возвращает число добавленных, обновленных, удаленных и неизмененных записей.
+    """
+    async with schedule_import_transaction() as conn:
+        # Импорты одной специальности выполняются по очереди
+        await conn.execute('SELECT pg_advisory_xact_lock(hashtext($1))', specialty)
+        existing = await run(conn, 'fetch', 'schedules_for_sync', specialty)
+        diff = diff_schedules(existing, records)
+
+        if diff.deletes:
+            await run(conn, 'execute', 'delete_schedules', diff.deletes)
+        if diff.updates:
+            await run(conn, 'executemany', 'update_schedule_attributes', diff.updates)
+        for start in range(0, len(diff.inserts), EXCEL_IMPORT_BATCH_SIZE):
+            await add_schedules_bulk(diff.inserts[start:start + EXCEL_IMPORT_BATCH_SIZE], conn=conn)
+
+        await _record_import_ledger(conn, specialty, files)
+
+    if diff.changed:
+        bump_schedule_version(specialty)
+    return {
+        'inserted': len(diff.inserts),
+        'updated': len(diff.updates),
+        'deleted': len(diff.deletes),
+        'unchanged': diff.unchanged,
+    }
+
+
+@asynccontextmanager
+async def schedule_staging():
+    """Соединение с пустой временной таблицей schedules_staging
+
+    В таблицу загружаются новые записи специальности (copy_to_staging)
+    без блокировок и вне транзакции, затем swap_staging заменяет ими
+    расписание. Таблица удаляется при выходе из контекста.
+    """
+    columns = ', '.join(SCHEDULE_COPY_COLUMNS)
+    async with acquire() as conn:
         await conn.execute(
-            '''INSERT INTO schedules (specialty, semester, day_of_week, time, subject, teacher, room, group_name)
-               VALUES ($1, $2, $3, $4, $5, $6, $7, $8)''',
-            specialty, semester, day_of_week, time, subject, teacher, room, group_name
+            f'CREATE TEMP TABLE IF NOT EXISTS schedules_staging AS '
+            f'SELECT {columns} FROM schedules WITH NO DATA'
+        )
+        try:
+            await conn.execute('TRUNCATE schedules_staging')
+            yield conn
+        finally:
+            await conn.execute('DROP TABLE IF EXISTS schedules_staging')
+
+
+async def copy_to_staging(conn: asyncpg.Connection, records: Iterable[Sequence]) -> int:
+    """Загрузить записи во временную таблицу через COPY (см. schedule_staging)"""
+    records = [_with_sort_keys(record) for record in records]
+    if records:
+        await conn.copy_records_to_table(
+            'schedules_staging', records=records, columns=SCHEDULE_COPY_COLUMNS
+        )
+    return len(records)
+
+
+async def swap_staging(conn: asyncpg.Connection, specialty: str,
+                       files: Sequence[Tuple[str, str, int]] = ()) -> Dict[str, int]:
+    """Заменить расписание специальности записями временной таблицы
+
+    Одна короткая транзакция удаляет старые записи и переносит новые
+    через INSERT ... SELECT, так что читатели видят либо старое, либо
+    новое расписание целиком. id записей меняются. files - как в
+    sync_specialty_schedules, журнал обновляется при замене.
+    Возвращает число добавленных и удаленных записей и время замены (swap_ms).
+    """
+    columns = ', '.join(SCHEDULE_COPY_COLUMNS)
+    started = time.perf_counter()
+    async with conn.transaction():
+        await conn.execute('SELECT pg_advisory_xact_lock(hashtext($1))', specialty)
+        deleted = await conn.fetchval(
+            'WITH deleted AS (DELETE FROM schedules WHERE specialty = $1 RETURNING 1) '
+            'SELECT count(*) FROM deleted',
+            specialty
+        )
+        inserted = await conn.fetchval(
+            f'WITH inserted AS (INSERT INTO schedules ({columns}) '
+            f'SELECT {columns} FROM schedules_staging RETURNING 1) '
+            f'SELECT count(*) FROM inserted'
+        )
+        await _record_import_ledger(conn, specialty, files)
+    swap_ms = (time.perf_counter() - started) * 1000
+
+    bump_schedule_version(specialty)
+    logger.info(
+        f"Расписание {specialty} заменено: удалено {deleted}, добавлено {inserted} "
+        f"за {swap_ms:.1f} мс"
+    )
+    return {'inserted': inserted, 'deleted': deleted, 'swap_ms': swap_ms}
+
+
+# Естественный ключ и атрибуты записи (см. database.schedule_diff) в виде
+# jsonb: в отличие от сравнения колонок, jsonb различает NULL и пустую
+# строку и допускает hash join
+_SYNC_KEY = 'jsonb_build_array(day_of_week, time, subject, group_name)'
+_SYNC_ATTRIBUTES = 'jsonb_build_array(semester, teacher, room)'
+
+
+async def sync_staging(conn: asyncpg.Connection, specialty: str,
+                       files: Sequence[Tuple[str, str, int]] = ()) -> Dict[str, int]:
+    """Привести расписание специальности к записям временной таблицы
+
+    То же, что sync_specialty_schedules, но записи файлов уже загружены
+    в schedules_staging (см. schedule_staging), а сравнение выполняется
+    в SQL, без загрузки расписания в память. Сопоставление как в
+    diff_schedules: полные совпадения (ключ и атрибуты, с учетом повторов)
+    остаются без изменений, оставшиеся записи с тем же ключом обновляются,
+    несопоставленные добавляются или удаляются.
+    """
+    columns = ', '.join(SCHEDULE_COPY_COLUMNS)
+    async with conn.transaction():
+        # Импорты одной специальности выполняются по очереди
+        await conn.execute('SELECT pg_advisory_xact_lock(hashtext($1))', specialty)
+        # rn - номер повтора среди записей с одинаковыми ключом и атрибутами
+        await conn.execute(f'''
+            CREATE TEMP TABLE sync_new ON COMMIT DROP AS
+            SELECT {columns}, k, a, row_number() OVER (PARTITION BY k, a) AS rn
+            FROM (SELECT *, {_SYNC_KEY} AS k, {_SYNC_ATTRIBUTES} AS a FROM schedules_staging) new
+        ''')
+        await conn.execute(f'''
+            CREATE TEMP TABLE sync_old ON COMMIT DROP AS
+            SELECT id, k, a, row_number() OVER (PARTITION BY k, a) AS rn
+            FROM (SELECT id, {_SYNC_KEY} AS k, {_SYNC_ATTRIBUTES} AS a
+                  FROM schedules WHERE specialty = $1) old
+        ''', specialty)
+        # Записи без полного совпадения; rk - номер в пределах ключа
+        await conn.execute('''
+            CREATE TEMP TABLE sync_pending ON COMMIT DROP AS
+            SELECT new.*, row_number() OVER (PARTITION BY new.k) AS rk
+            FROM sync_new new
+            WHERE NOT EXISTS (SELECT 1 FROM sync_old old
+                              WHERE old.k = new.k AND old.a = new.a AND old.rn = new.rn)
+        ''')
+        await conn.execute('''
+            CREATE TEMP TABLE sync_left ON COMMIT DROP AS
+            SELECT old.id, old.k, row_number() OVER (PARTITION BY old.k) AS rk
+            FROM sync_old old
+            WHERE NOT EXISTS (SELECT 1 FROM sync_new new
+                              WHERE new.k = old.k AND new.a = old.a AND new.rn = old.rn)
+        ''')
+        unchanged = await conn.fetchval(
+            'SELECT (SELECT count(*) FROM sync_new) - (SELECT count(*) FROM sync_pending)'
         )
+        updated = await conn.fetchval('''
+            WITH updated AS (
+                UPDATE schedules s SET semester = p.semester, teacher = p.teacher, room = p.room
+                FROM sync_pending p JOIN sync_left l ON l.k = p.k AND l.rk = p.rk
+                WHERE s.id = l.id
+                RETURNING 1
+            ) SELECT count(*) FROM updated
+        ''')
+        deleted = await conn.fetchval('''
+            WITH deleted AS (
+                DELETE FROM schedules WHERE id IN (
+                    SELECT l.id FROM sync_left l
+                    WHERE NOT EXISTS (SELECT 1 FROM sync_pending p WHERE p.k = l.k AND p.rk = l.rk)
+                )
+                RETURNING 1
+            ) SELECT count(*) FROM deleted
+        ''')
+        inserted = await conn.fetchval(f'''
+            WITH inserted AS (
+                INSERT INTO schedules ({columns})
+                SELECT {columns} FROM sync_pending p
+                WHERE NOT EXISTS (SELECT 1 FROM sync_left l WHERE l.k = p.k AND l.rk = p.rk)
+                RETURNING 1
+            ) SELECT count(*) FROM inserted
+        ''')
+        await _record_import_ledger(conn, specialty, files)
+
+    if inserted or updated or deleted:
+        bump_schedule_version(specialty)
+    return {'inserted': inserted, 'updated': updated, 'deleted': deleted, 'unchanged': unchanged}
+
+
+async def replace_specialty_schedules(specialty: str, records: Iterable[Sequence],
+                                      files: Sequence[Tuple[str, str, int]] = ()) -> Dict[str, int]:
+    """Заменить расписание специальности целиком
+
+    Новые записи сначала загружаются через COPY во временную таблицу
+    соединения (см. schedule_staging), затем заменяют старые одной
+    короткой транзакцией (см. swap_staging).
+    Возвращает число добавленных и удаленных записей и время замены (swap_ms).
+    """
+    async with schedule_staging() as conn:
+        await copy_to_staging(conn, records)
+        return await swap_staging(conn, specialty, files)
+
+
+def get_schedule_version(specialty: str) -> int:
+    """Текущая версия расписания специальности
+
+    Версия только растет, поэтому по ней можно кэшировать и производные
+    данные (например, готовые тексты сообщений, см. utils.schedule_render).
+    """
+    return _schedule_epoch + _schedule_versions.get(specialty, 0)
+
+
+def bump_schedule_version(specialty: str = None):
+    """Отметить изменение расписания специальности (None - всех специальностей)
+
+    Вызывается после фиксации изменений, чтобы кэш не сохранил старые данные
+    под новой версией.
+    """
+    global _schedule_bumps, _schedule_epoch
+    _schedule_bumps += 1
+    if specialty is None:
+        # Меняет версию и тех специальностей, которые еще не запрашивались
+        _schedule_epoch += 1
+        _schedule_cache.clear()
+        return
+    _schedule_versions[specialty] = _schedule_versions.get(specialty, 0) + 1
+
+
+def get_schedule_cache_stats() -> Dict:
+    """Статистика кэша расписания"""
+    stats = _schedule_cache.stats()
+    stats['specialties_tracked'] = len(_schedule_versions)
+    return stats
 
 
 async def get_schedules_by_specialty(specialty: str, day: str = None) -> List[Dict]:
-    """Получить расписание по специальности"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        if day:
-            rows = await conn.fetch(
-                'SELECT * FROM schedules WHERE specialty = $1 AND day_of_week = $2 ORDER BY time',
-                specialty, day
-            )
+    """Получить расписание по специальности
+
+    Результат кэшируется до следующего изменения расписания специальности.
+    Возвращаемые записи общие для всех вызовов - их нельзя изменять.
+    """
+    key = (specialty, day or None)
+    version = get_schedule_version(specialty)
+    cached = _schedule_cache.get(key, version)
+    if cached is not None:
+        return list(cached)
+    
+    weekday = parse_weekday(day)
+    async with acquire() as conn:
+        if weekday is not None:
+            rows = await run(conn, 'fetch', 'schedules_by_weekday', specialty, weekday)
+        elif day:
+            rows = await run(conn, 'fetch', 'schedules_by_day', specialty, day)
         else:
-            rows = await conn.fetch(
-                'SELECT * FROM schedules WHERE specialty = $1 ORDER BY day_of_week, time',
-                specialty
-            )
-        return [dict(row) for row in rows]
+            rows = await run(conn, 'fetch', 'schedules_by_specialty', specialty)
+    schedules = [dict(row) for row in rows]
+    _schedule_cache.set(key, version, schedules)
+    return list(schedules)
 
 
-async def search_schedules(query: str, specialty: str = None) -> List[Dict]:
-    """Поиск в расписании (регистронезависимый)"""
+async def _search_like(conn: asyncpg.Connection, query: str, specialty: str = None,
+                       limit: int = None) -> List[asyncpg.Record]:
+    """Поиск подстроки через LIKE (без ранжирования)"""
     query_lower = f'%{query.lower()}%'
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        if specialty:
-            rows = await conn.fetch(
-                '''SELECT * FROM schedules 
-                   WHERE specialty = $1 AND (LOWER(subject) LIKE $2 OR LOWER(teacher) LIKE $2)
-                   ORDER BY day_of_week, time''',
-                specialty, query_lower
-            )
+    if specialty:
+        return await run(conn, 'fetch', 'search_like_specialty', specialty, query_lower, limit)
+    return await run(conn, 'fetch', 'search_like', query_lower, limit)
+
+
+async def _search_trgm(conn: asyncpg.Connection, query: str, specialty: str = None,
+                       limit: int = None) -> List[asyncpg.Record]:
+    """Поиск по триграммам с ранжированием
+
+    Находит как точные вхождения подстроки, так и похожие слова (опечатки).
+    Вхождения подстроки ранжируются выше, затем - по сходству слов.
+    """
+    query_lower = query.lower()
+    return await run(
+        conn, 'fetch', 'search_trgm',
+        query_lower, f'%{query_lower}%', specialty, limit
+    )
+
+
+async def search_schedules(query: str, specialty: str = None, mode: str = None,
+                           limit: int = SEARCH_RESULT_LIMIT) -> List[Dict]:
+    """Поиск в расписании (регистронезависимый)
+
+    mode: 'trgm' - ранжированный поиск по триграммам, 'like' - поиск подстроки.
+    По умолчанию используется 'trgm', если pg_trgm доступен.
+    limit - максимальное число результатов (None - без ограничения).
+    """
+    if mode is None:
+        mode = 'trgm' if _trgm_available else 'like'
+    if mode not in ('trgm', 'like'):
+        raise ValueError(f"Неизвестный режим поиска: {mode}")
+    if mode == 'trgm' and not _trgm_available:
+        mode = 'like'
+    
+    async with acquire() as conn:
+        if mode == 'trgm':
+            rows = await _search_trgm(conn, query, specialty, limit)
         else:
-            rows = await conn.fetch(
-                '''SELECT * FROM schedules 
-                   WHERE LOWER(subject) LIKE $1 OR LOWER(teacher) LIKE $1
-                   ORDER BY specialty, day_of_week, time''',
-                query_lower
-            )
+            rows = await _search_like(conn, query, specialty, limit)
         return [dict(row) for row in rows]
 
 
 async def get_all_schedules() -> List[Dict]:
     """Получить все расписания (для преподавателя)"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch('SELECT * FROM schedules ORDER BY specialty, day_of_week, time')
+    async with acquire() as conn:
+        rows = await run(conn, 'fetch', 'get_all_schedules')
         return [dict(row) for row in rows]
 
 
+# Порядок постраничного просмотра (совпадает с индексом idx_schedules_page_key)
+_PAGE_KEY = "specialty, COALESCE(weekday, 7), COALESCE(time_start, '24:00'::time), time, id"
+_PAGE_KEY_DESC = (
+    "specialty DESC, COALESCE(weekday, 7) DESC, COALESCE(time_start, '24:00'::time) DESC, "
+    "time DESC, id DESC"
+)
+
+
+async def get_schedules_page(after_key: int = None, limit: int = 20, before_key: int = None) -> Dict:
+    """Страница всех расписаний с навигацией по ключу (keyset pagination)
+
+    after_key / before_key - id записи, после (до) которой начинается страница.
+    Строки читаются через серверный курсор, поэтому время выборки не зависит
+    от номера страницы и размера таблицы.
+    Возвращает {'schedules': [...], 'prev_key': id или None, 'next_key': id или None}.
+    """
+    backward = before_key is not None
+    key_id = before_key if backward else after_key
+    
+    async with acquire() as conn:
+        async with conn.transaction():
+            # Ключ записи сравнивается в самом запросе: в Python его не передать,
+            # asyncpg не декодирует время 24:00 из COALESCE для пустого time_start
+            key = False
+            if key_id is not None:
+                key = await conn.fetchval('SELECT EXISTS (SELECT 1 FROM schedules WHERE id = $1)', key_id)
+            
+            if not key:
+                # Первая страница (или запись-ключ уже удалена)
+                backward = False
+                cursor = await conn.cursor(f'SELECT * FROM schedules ORDER BY {_PAGE_KEY}')
+            elif backward:
+                cursor = await conn.cursor(
+                    f'SELECT * FROM schedules '
+                    f'WHERE ({_PAGE_KEY}) < (SELECT {_PAGE_KEY} FROM schedules WHERE id = $1) '
+                    f'ORDER BY {_PAGE_KEY_DESC}',
+                    key_id
+                )
+            else:
+                cursor = await conn.cursor(
+                    f'SELECT * FROM schedules '
+                    f'WHERE ({_PAGE_KEY}) > (SELECT {_PAGE_KEY} FROM schedules WHERE id = $1) '
+                    f'ORDER BY {_PAGE_KEY}',
+                    key_id
+                )
+            rows = await cursor.fetch(limit + 1)
+    
+    has_more = len(rows) > limit
+    schedules = [dict(row) for row in rows[:limit]]
+    if backward:
+        schedules.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = key, has_more
+    
+    return {
+        'schedules': schedules,
+        'prev_key': schedules[0]['id'] if schedules and has_prev else None,
+        'next_key': schedules[-1]['id'] if schedules and has_next else None,
+    }
+
+
 async def delete_schedule(schedule_id: int):
     """Удалить запись из расписания"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute('DELETE FROM schedules WHERE id = $1', schedule_id)
+    async with acquire() as conn:
+        specialty = await run(conn, 'fetchval', 'delete_schedule', schedule_id)
+    if specialty is not None:
+        bump_schedule_version(specialty)
 
 
 async def get_schedule_by_id(schedule_id: int) -> Optional[Dict]:
     """Получить запись расписания по ID"""
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow('SELECT * FROM schedules WHERE id = $1', schedule_id)
+    async with acquire() as conn:
+        row = await run(conn, 'fetchrow', 'get_schedule_by_id', schedule_id)
         return dict(row) if row else None
 
 
@@ -276,8 +789,13 @@ async def update_schedule(schedule_id: int, **kwargs):
     if not updates:
         return
     
-    pool = await get_pool()
-    async with pool.acquire() as conn:
+    # Ключи сортировки пересчитываются вместе с исходными строками
+    if 'day_of_week' in updates:
+        updates['weekday'] = parse_weekday(updates['day_of_week'])
+    if 'time' in updates:
+        updates['time_start'], updates['time_end'] = parse_time_range(updates['time'])
+    
+    async with acquire() as conn:
         # Пересоздаем запрос с правильными плейсхолдерами
         set_parts = []
         params = []
@@ -289,8 +807,15 @@ async def update_schedule(schedule_id: int, **kwargs):
         set_clause = ', '.join(set_parts)
         params.append(schedule_id)
         
-        await conn.execute(
-            f'UPDATE schedules SET {set_clause} WHERE id = ${param_num}',
+        # Возвращаем старую и новую специальность, чтобы сбросить кэш обеих
+        row = await conn.fetchrow(
+            f'''UPDATE schedules s SET {set_clause}
+                FROM (SELECT id, specialty AS old_specialty FROM schedules WHERE id = ${param_num}) old
+                WHERE s.id = old.id
+                RETURNING old.old_specialty, s.specialty''',
             *params
         )
+    if row:
+        for specialty in {row['old_specialty'], row['specialty']}:
+            bump_schedule_version(specialty)
 
@@ -0,0 +1,31 @@
+-- Базовые таблицы (IF NOT EXISTS - для БД, созданных до появления миграций)
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id BIGINT PRIMARY KEY,
+    role VARCHAR(20) NOT NULL DEFAULT 'student',
+    specialty VARCHAR(255),
+    user_group VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Колонка user_group появилась позже первой версии таблицы users
+ALTER TABLE users ADD COLUMN IF NOT EXISTS user_group VARCHAR(50);
+
+CREATE TABLE IF NOT EXISTS specialties (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    code VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS schedules (
+    id SERIAL PRIMARY KEY,
+    specialty VARCHAR(255) NOT NULL,
+    semester VARCHAR(50),
+    day_of_week VARCHAR(20) NOT NULL,
+    time VARCHAR(20) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    teacher VARCHAR(255),
+    room VARCHAR(50),
+    group_name VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,5 @@
+-- Составной индекс под выборки расписания студентов:
+-- WHERE specialty = $1 [AND day_of_week = $2] ORDER BY day_of_week, time,
+-- а также общий список ORDER BY specialty, day_of_week, time
+CREATE INDEX IF NOT EXISTS idx_schedules_specialty_day_time
+    ON schedules (specialty, day_of_week, time);
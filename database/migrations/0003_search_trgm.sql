@@ -0,0 +1,22 @@
+-- Триграммные индексы для поиска по предмету и преподавателю.
+-- Если pg_trgm недоступен (нет прав или пакета contrib), миграция
+-- ничего не делает, а поиск работает через LIKE.
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm недоступен: %', SQLERRM;
+END
+$$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_schedules_subject_trgm
+            ON schedules USING GIN (LOWER(subject) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_schedules_teacher_trgm
+            ON schedules USING GIN (LOWER(teacher) gin_trgm_ops);
+    END IF;
+END
+$$;
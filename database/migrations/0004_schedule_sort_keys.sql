@@ -0,0 +1,36 @@
+-- Числовой день недели и разобранное время занятия вместо сортировки строк.
+-- Значения для новых записей вычисляются при записи (database/schedule_keys.py),
+-- здесь заполняются существующие строки по тем же правилам.
+
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS weekday SMALLINT;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS time_start TIME;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS time_end TIME;
+
+UPDATE schedules SET weekday = CASE left(lower(btrim(day_of_week)), 2)
+    WHEN 'по' THEN 0 WHEN 'пн' THEN 0
+    WHEN 'вт' THEN 1
+    WHEN 'ср' THEN 2
+    WHEN 'че' THEN 3 WHEN 'чт' THEN 3
+    WHEN 'пя' THEN 4 WHEN 'пт' THEN 4
+    WHEN 'су' THEN 5 WHEN 'сб' THEN 5
+    WHEN 'во' THEN 6 WHEN 'вс' THEN 6
+END;
+
+WITH parsed AS (
+    SELECT id,
+           regexp_match(time, '(\d{1,2})[:.](\d{2})') AS s,
+           regexp_match(time, '\d{1,2}[:.]\d{2}\D+(\d{1,2})[:.](\d{2})') AS e
+    FROM schedules
+)
+UPDATE schedules sc SET
+    time_start = CASE WHEN p.s[1]::int < 24 AND p.s[2]::int < 60
+                      THEN make_time(p.s[1]::int, p.s[2]::int, 0) END,
+    time_end = CASE WHEN p.e[1]::int < 24 AND p.e[2]::int < 60
+                    THEN make_time(p.e[1]::int, p.e[2]::int, 0) END
+FROM parsed p
+WHERE sc.id = p.id;
+
+-- Индекс под WHERE specialty = $1 [AND weekday = $2] ORDER BY weekday, time_start, time
+DROP INDEX IF EXISTS idx_schedules_specialty_day_time;
+CREATE INDEX IF NOT EXISTS idx_schedules_specialty_weekday_time
+    ON schedules (specialty, weekday, time_start, time);
@@ -0,0 +1,5 @@
+-- Индекс для постраничного просмотра всех расписаний (keyset pagination).
+-- NULL в weekday/time_start заменяются значениями "в конце", чтобы
+-- сравнение ключей строк было строгим.
+CREATE INDEX IF NOT EXISTS idx_schedules_page_key
+    ON schedules (specialty, (COALESCE(weekday, 7)), (COALESCE(time_start, '24:00'::time)), time, id);
@@ -0,0 +1,11 @@
+-- Журнал импорта Excel файлов: хэш содержимого каждого загруженного файла.
+-- Файлы с неизменным хэшем при повторной загрузке пропускаются.
+CREATE TABLE IF NOT EXISTS import_ledger (
+    file_path VARCHAR(1024) PRIMARY KEY,
+    specialty VARCHAR(255) NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_ledger_specialty ON import_ledger (specialty);
@@ -0,0 +1,99 @@
+"""
+Версионные миграции схемы PostgreSQL
+
+Миграции - SQL файлы в database/migrations вида NNNN_описание.sql,
+применяются по возрастанию номера. Номер последней примененной миграции
+хранится в таблице schema_version.
+"""
+import logging
+import os
+import re
+from typing import List, NamedTuple, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_MIGRATION_RE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# Ключ advisory lock, чтобы бот и API не применяли миграции одновременно
+_MIGRATION_LOCK_KEY = 725_001
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+def list_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Список миграций, отсортированный по номеру"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_RE.match(filename)
+        if match:
+            migrations.append(Migration(
+                int(match.group(1)), match.group(2), os.path.join(directory, filename)
+            ))
+    migrations.sort()
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Повторяющиеся номера миграций в {directory}")
+    return migrations
+
+
+async def get_schema_version(conn: asyncpg.Connection) -> int:
+    """Текущая версия схемы (0, если миграции еще не применялись)"""
+    exists = await conn.fetchval("SELECT to_regclass('schema_version') IS NOT NULL")
+    if not exists:
+        return 0
+    version = await conn.fetchval('SELECT MAX(version) FROM schema_version')
+    return version or 0
+
+
+async def migrate(conn: asyncpg.Connection) -> Tuple[int, int]:
+    """Применить недостающие миграции
+
+    Возвращает версию схемы до и после применения. Если схема актуальна,
+    выполняется только чтение schema_version.
+    """
+    migrations = list_migrations()
+    latest = migrations[-1].version if migrations else 0
+
+    current = previous = await get_schema_version(conn)
+    if current >= latest:
+        return previous, current
+
+    await conn.execute('SELECT pg_advisory_lock($1)', _MIGRATION_LOCK_KEY)
+    try:
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Пока ждали блокировку, миграции мог применить другой процесс
+        current = await get_schema_version(conn)
+
+        for migration in migrations:
+            if migration.version <= current:
+                continue
+            with open(migration.path, encoding='utf-8') as f:
+                sql = f.read()
+
+            logger.info(f"Применение миграции {migration.version:04d}_{migration.name}")
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    'INSERT INTO schema_version (version, name) VALUES ($1, $2)',
+                    migration.version, migration.name
+                )
+            current = migration.version
+    finally:
+        await conn.execute('SELECT pg_advisory_unlock($1)', _MIGRATION_LOCK_KEY)
+
+    return previous, current
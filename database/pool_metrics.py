@@ -0,0 +1,95 @@
+"""
+Метрики пула соединений: время ожидания соединения и таймауты
+
+Пул существует только в процессе бота, поэтому бот периодически
+публикует снимок метрик в файл (write_snapshot), а API читает его
+(read_snapshot).
+"""
+import bisect
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+import asyncpg
+
+# Верхние границы корзин гистограммы времени ожидания (мс)
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """Гистограмма времени ожидания pool.acquire() и счетчик таймаутов"""
+
+    def __init__(self, buckets_ms=WAIT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.reset()
+
+    def reset(self):
+        """Обнулить метрики"""
+        # Последняя корзина - ожидания дольше самой большой границы
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.acquired = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record_acquire(self, wait_seconds: float):
+        """Учесть успешное получение соединения"""
+        wait_ms = wait_seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, wait_ms)] += 1
+        self.acquired += 1
+        self.in_use += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_release(self):
+        """Учесть возврат соединения в пул"""
+        self.in_use -= 1
+
+    def record_timeout(self):
+        """Учесть таймаут ожидания соединения"""
+        self.timeouts += 1
+
+    def histogram(self) -> Dict[str, int]:
+        """Гистограмма ожидания: верхняя граница корзины -> количество"""
+        labels = [f'<={bound}ms' for bound in self.buckets_ms] + [f'>{self.buckets_ms[-1]}ms']
+        return dict(zip(labels, self.counts))
+
+    def snapshot(self, pool: Optional[asyncpg.Pool] = None) -> Dict[str, Any]:
+        """Текущие значения метрик (и размеры пула, если он создан)"""
+        stats = {
+            'acquired': self.acquired,
+            'timeouts': self.timeouts,
+            'in_use': self.in_use,
+            'avg_wait_ms': self.total_wait_ms / self.acquired if self.acquired else 0.0,
+            'max_wait_ms': self.max_wait_ms,
+            'wait_histogram': self.histogram(),
+        }
+        if pool is not None:
+            stats.update({
+                'size': pool.get_size(),
+                'idle': pool.get_idle_size(),
+                'min_size': pool.get_min_size(),
+                'max_size': pool.get_max_size(),
+            })
+        return stats
+
+
+def write_snapshot(path: str, stats: Dict[str, Any]):
+    """Записать снимок метрик в файл атомарно (с временем записи updated_at)"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(stats, updated_at=time.time()), f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """Прочитать опубликованный снимок метрик (с возрастом age_seconds)
+
+    FileNotFoundError - бот еще не публиковал метрики.
+    """
+    with open(path, encoding='utf-8') as f:
+        stats = json.load(f)
+    stats['age_seconds'] = time.time() - stats.get('updated_at', 0)
+    return stats
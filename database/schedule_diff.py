@@ -0,0 +1,79 @@
+"""
+Сравнение записей расписания из файла с записями в БД
+
+Записи сопоставляются по естественному ключу (день, время, предмет,
+группа). Совпавшие по ключу записи с другими преподавателем, аудиторией
+или семестром обновляются, несопоставленные - добавляются или удаляются.
+"""
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Sequence, Tuple
+
+# Индексы полей записи в порядке SCHEDULE_RECORD_COLUMNS
+_KEY_INDEXES = (2, 3, 4, 7)         # day_of_week, time, subject, group_name
+_ATTRIBUTE_INDEXES = (1, 5, 6)      # semester, teacher, room
+
+NATURAL_KEY_COLUMNS = ('day_of_week', 'time', 'subject', 'group_name')
+ATTRIBUTE_COLUMNS = ('semester', 'teacher', 'room')
+
+
+class ScheduleDiff(NamedTuple):
+    # Новые записи (кортежи в порядке SCHEDULE_RECORD_COLUMNS)
+    inserts: List[tuple]
+    # (id, semester, teacher, room) для записей с измененными атрибутами
+    updates: List[tuple]
+    # id удаляемых записей
+    deletes: List[int]
+    # Число записей без изменений
+    unchanged: int
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+
+def _record_key(record: Sequence) -> Tuple:
+    return tuple(record[i] for i in _KEY_INDEXES)
+
+
+def _record_attributes(record: Sequence) -> Tuple:
+    return tuple(record[i] for i in _ATTRIBUTE_INDEXES)
+
+
+def diff_schedules(existing: Iterable[Mapping], records: Iterable[Sequence]) -> ScheduleDiff:
+    """Изменения, которые превращают existing в records
+
+    existing - строки БД с колонкой id и колонками записи расписания,
+    records - кортежи в порядке SCHEDULE_RECORD_COLUMNS. Повторяющиеся
+    записи учитываются по количеству.
+    """
+    # ключ -> [(id, атрибуты)] записей БД, еще не сопоставленных с файлом
+    by_key: Dict[Tuple, List[Tuple[int, Tuple]]] = {}
+    for row in existing:
+        key = tuple(row[column] for column in NATURAL_KEY_COLUMNS)
+        attributes = tuple(row[column] for column in ATTRIBUTE_COLUMNS)
+        by_key.setdefault(key, []).append((row['id'], attributes))
+
+    # Сначала забираем полные совпадения, чтобы не обновлять лишнего
+    unchanged = 0
+    pending = []
+    for record in records:
+        candidates = by_key.get(_record_key(record))
+        attributes = _record_attributes(record)
+        for i, (_, existing_attributes) in enumerate(candidates or ()):
+            if existing_attributes == attributes:
+                del candidates[i]
+                unchanged += 1
+                break
+        else:
+            pending.append(record)
+
+    inserts, updates = [], []
+    for record in pending:
+        candidates = by_key.get(_record_key(record))
+        if candidates:
+            schedule_id, _ = candidates.pop()
+            updates.append((schedule_id,) + _record_attributes(record))
+        else:
+            inserts.append(tuple(record))
+
+    deletes = [schedule_id for candidates in by_key.values() for schedule_id, _ in candidates]
+    return ScheduleDiff(inserts, updates, deletes, unchanged)
@@ -0,0 +1,69 @@
+"""
+Ключи сортировки расписания: номер дня недели и время начала/окончания
+
+Вычисляются один раз при записи и хранятся в колонках weekday,
+time_start и time_end таблицы schedules.
+"""
+import re
+from datetime import time
+from typing import Optional, Tuple
+
+# Названия дней недели, индекс совпадает с datetime.weekday()
+WEEKDAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
+
+# Первые две буквы полных названий и сокращений (Пн, Вт, ...)
+_WEEKDAY_PREFIXES = {
+    'по': 0, 'пн': 0,
+    'вт': 1,
+    'ср': 2,
+    'че': 3, 'чт': 3,
+    'пя': 4, 'пт': 4,
+    'су': 5, 'сб': 5,
+    'во': 6, 'вс': 6,
+}
+
+_TIME_START_RE = re.compile(r'(\d{1,2})[:.](\d{2})')
+_TIME_END_RE = re.compile(r'\d{1,2}[:.]\d{2}\D+(\d{1,2})[:.](\d{2})')
+
+
+def parse_weekday(day: Optional[str]) -> Optional[int]:
+    """Номер дня недели (0 - понедельник) или None, если день не распознан"""
+    if not day:
+        return None
+    return _WEEKDAY_PREFIXES.get(day.strip().lower()[:2])
+
+
+def _to_time(match) -> Optional[time]:
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def parse_time_range(value: Optional[str]) -> Tuple[Optional[time], Optional[time]]:
+    """Время начала и окончания из строки вида '09:00-10:30' или '9.00 – 10.30'"""
+    if not value:
+        return None, None
+    return _to_time(_TIME_START_RE.search(value)), _to_time(_TIME_END_RE.search(value))
+
+
+def schedule_sort_keys(day_of_week: Optional[str], time_value: Optional[str]) -> Tuple:
+    """Значения колонок (weekday, time_start, time_end) для записи расписания"""
+    return (parse_weekday(day_of_week),) + parse_time_range(time_value)
+
+
+def schedule_sort_key(schedule: dict) -> Tuple:
+    """Ключ сортировки записи: специальность, день недели, время начала
+
+    Нераспознанные дни и время идут в конце, как NULLS LAST в запросах.
+    """
+    weekday = schedule.get('weekday')
+    time_start = schedule.get('time_start')
+    return (
+        schedule.get('specialty') or '',
+        weekday if weekday is not None else len(WEEKDAYS),
+        time_start if time_start is not None else time.max,
+        schedule.get('time') or '',
+    )
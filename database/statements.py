@@ -0,0 +1,155 @@
+"""
+Реестр часто выполняемых SQL запросов
+
+Запросы подготавливаются на сервере один раз для каждого соединения пула
+(prepare_statements передается в asyncpg.create_pool как init) и дальше
+выполняются по имени через run(). Подготовленные операторы хранятся в
+кэше операторов asyncpg самого соединения, поэтому повторное выполнение
+не требует разбора и планирования запроса.
+"""
+import logging
+import time
+from typing import Dict
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+STATEMENTS: Dict[str, str] = {
+    # Пользователи
+    'get_user': 'SELECT * FROM users WHERE user_id = $1',
+    'add_user': '''INSERT INTO users (user_id, role, specialty, user_group)
+                   VALUES ($1, $2, $3, $4)
+                   ON CONFLICT (user_id) DO NOTHING''',
+    # Пользователь (создается при отсутствии) и его расписание на день $3
+    'get_or_create_user_context': '''WITH inserted AS (
+                                         INSERT INTO users (user_id, role) VALUES ($1, $2)
+                                         ON CONFLICT (user_id) DO NOTHING
+                                         RETURNING *
+                                     ), u AS (
+                                         SELECT *, TRUE AS created FROM inserted
+                                         UNION ALL
+                                         SELECT *, FALSE AS created FROM users
+                                         WHERE user_id = $1 AND NOT EXISTS (SELECT 1 FROM inserted)
+                                     )
+                                     SELECT u.*, day.schedules
+                                     FROM u
+                                     LEFT JOIN LATERAL (
+                                         SELECT array_agg(s ORDER BY s.time_start, s.time) AS schedules
+                                         FROM schedules s
+                                         WHERE s.specialty = u.specialty AND s.weekday = $3
+                                     ) day ON TRUE''',
+    'update_user_specialty': 'UPDATE users SET specialty = $1 WHERE user_id = $2',
+    'update_user_group': 'UPDATE users SET user_group = $1 WHERE user_id = $2',
+
+    # Специальности
+    'add_specialty': '''INSERT INTO specialties (name, code)
+                        VALUES ($1, $2)
+                        ON CONFLICT (name) DO NOTHING''',
+    'get_all_specialties': 'SELECT * FROM specialties ORDER BY name',
+
+    # Расписание
+    'add_schedule': '''INSERT INTO schedules (specialty, semester, day_of_week, time, subject, teacher, room,
+                                              group_name, weekday, time_start, time_end)
+                       VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)''',
+    'schedules_by_weekday': '''SELECT * FROM schedules WHERE specialty = $1 AND weekday = $2
+                               ORDER BY time_start, time''',
+    'schedules_by_day': '''SELECT * FROM schedules WHERE specialty = $1 AND day_of_week = $2
+                           ORDER BY time_start, time''',
+    'schedules_by_specialty': '''SELECT * FROM schedules WHERE specialty = $1
+                                 ORDER BY weekday, time_start, time''',
+    'get_all_schedules': 'SELECT * FROM schedules ORDER BY specialty, weekday, time_start, time',
+    'get_schedule_by_id': 'SELECT * FROM schedules WHERE id = $1',
+    'delete_schedule': 'DELETE FROM schedules WHERE id = $1 RETURNING specialty',
+
+    # Импорт: синхронизация расписания специальности с файлами
+    'schedules_for_sync': '''SELECT id, semester, day_of_week, time, subject, teacher, room, group_name
+                             FROM schedules WHERE specialty = $1
+                             FOR UPDATE''',
+    'delete_schedules': 'DELETE FROM schedules WHERE id = ANY($1::int[])',
+    'update_schedule_attributes': 'UPDATE schedules SET semester = $2, teacher = $3, room = $4 WHERE id = $1',
+    'get_import_ledger': 'SELECT * FROM import_ledger',
+    'upsert_import_ledger': '''INSERT INTO import_ledger (file_path, specialty, content_hash, row_count)
+                               VALUES ($1, $2, $3, $4)
+                               ON CONFLICT (file_path) DO UPDATE
+                               SET specialty = EXCLUDED.specialty,
+                                   content_hash = EXCLUDED.content_hash,
+                                   row_count = EXCLUDED.row_count,
+                                   imported_at = CURRENT_TIMESTAMP''',
+    'delete_stale_import_ledger': 'DELETE FROM import_ledger WHERE specialty = $1 AND file_path <> ALL($2::varchar[])',
+
+    # Поиск
+    'search_like_specialty': '''SELECT * FROM schedules
+                                WHERE specialty = $1 AND (LOWER(subject) LIKE $2 OR LOWER(teacher) LIKE $2)
+                                ORDER BY weekday, time_start, time
+                                LIMIT $3''',
+    'search_like': '''SELECT * FROM schedules
+                      WHERE LOWER(subject) LIKE $1 OR LOWER(teacher) LIKE $1
+                      ORDER BY specialty, weekday, time_start, time
+                      LIMIT $2''',
+    'search_trgm': '''SELECT *,
+                             GREATEST(
+                                 CASE WHEN LOWER(subject) LIKE $2 OR LOWER(teacher) LIKE $2 THEN 1 ELSE 0 END,
+                                 word_similarity($1, LOWER(subject)),
+                                 word_similarity($1, LOWER(teacher))
+                             ) AS rank
+                      FROM schedules
+                      WHERE ($3::varchar IS NULL OR specialty = $3)
+                        AND (LOWER(subject) LIKE $2 OR LOWER(teacher) LIKE $2
+                             OR $1 <% LOWER(subject) OR $1 <% LOWER(teacher))
+                      ORDER BY rank DESC, specialty, weekday, time_start, time
+                      LIMIT $4''',
+}
+
+# name -> [число вызовов, суммарное время в секундах]
+_stats: Dict[str, list] = {name: [0, 0.0] for name in STATEMENTS}
+
+
+async def prepare_statements(conn: asyncpg.Connection):
+    """Подготовить все запросы реестра на новом соединении (init hook пула)
+
+    executemany с пустым списком параметров только подготавливает запрос
+    и помещает его в кэш операторов соединения, ничего не выполняя.
+    Запросы, которые пока нельзя подготовить (схема еще не создана,
+    нет pg_trgm), будут подготовлены при первом выполнении.
+    """
+    for name, sql in STATEMENTS.items():
+        try:
+            await conn.executemany(sql, [])
+        except asyncpg.exceptions.PostgresError as e:
+            logger.debug(f"Запрос {name} не подготовлен: {e}")
+
+
+async def run(conn: asyncpg.Connection, method: str, name: str, *args):
+    """Выполнить запрос реестра по имени
+
+    method - метод соединения: 'fetch', 'fetchrow', 'fetchval', 'execute'
+    или 'executemany' (тогда единственный аргумент - список наборов параметров).
+    """
+    sql = STATEMENTS[name]
+    started = time.perf_counter()
+    try:
+        return await getattr(conn, method)(sql, *args)
+    finally:
+        stats = _stats[name]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def get_statement_stats() -> Dict[str, Dict]:
+    """Число вызовов и суммарное время по запросам, самые затратные первыми"""
+    result = {}
+    for name, (calls, total) in sorted(_stats.items(), key=lambda item: item[1][1], reverse=True):
+        result[name] = {
+            'calls': calls,
+            'total_ms': total * 1000,
+            'avg_ms': total * 1000 / calls if calls else 0.0,
+        }
+    return result
+
+
+def reset_statement_stats():
+    """Обнулить статистику запросов"""
+    for stats in _stats.values():
+        stats[0] = 0
+        stats[1] = 0.0
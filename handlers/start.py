@@ -2,8 +2,8 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
 from config import TEACHER_ID
-from database.db import get_user, add_user
-from keyboards.inline import get_main_menu_keyboard
+from database.db import get_or_create_user_context
+from keyboards.inline import main_menu_keyboard
 
 router = Router()
 
@@ -15,10 +15,9 @@ async def cmd_start(message: Message):
     # Проверяем, является ли пользователь преподавателем
     is_teacher = user_id == TEACHER_ID
     
-    # Получаем или создаем пользователя
-    user = await get_user(user_id)
-    if not user:
-        await add_user(user_id, role='teacher' if is_teacher else 'student')
+    # Получаем или создаем пользователя (одним запросом вместе с расписанием на сегодня,
+    # которое попадает в кэш для экрана "Расписание на сегодня")
+    await get_or_create_user_context(user_id, role='teacher' if is_teacher else 'student')
     
     if is_teacher:
         text = "👋 Добро пожаловать, преподаватель!\n\n"
@@ -34,6 +33,6 @@ async def cmd_start(message: Message):
     
     await message.answer(
         text,
-        reply_markup=await get_main_menu_keyboard(is_teacher=is_teacher)
+        reply_markup=main_menu_keyboard(is_teacher)
     )
 
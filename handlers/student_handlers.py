@@ -2,10 +2,15 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from datetime import datetime
-from database.db import get_user, update_user_specialty, update_user_group, get_schedules_by_specialty, search_schedules
-from keyboards.inline import get_specialties_keyboard, get_days_keyboard, get_main_menu_keyboard
-from utils.formatters import format_schedules_list
+from database.db import (
+    get_user, get_or_create_user_context, update_user_specialty, update_user_group,
+    search_schedules
+)
+from database.schedule_keys import WEEKDAYS
+from keyboards.inline import KEYBOARDS, get_specialties_keyboard, main_menu_keyboard
+from utils.pagination import get_page, show_paged, show_schedule
+from utils.schedule_image import send_week_image
+from utils.templates import render
 from config import TEACHER_ID
 
 router = Router()
@@ -40,6 +45,20 @@ async def choose_specialty(callback: CallbackQuery):
     await callback.answer()
 
 
+@router.callback_query(F.data.startswith("specs_page_"))
+async def specialties_page(callback: CallbackQuery):
+    """Листание страниц клавиатуры выбора специальности (в любом состоянии)"""
+    page, _, show_back = callback.data.replace("specs_page_", "").partition("_")
+    if not page.isdigit():
+        await callback.answer("❌ Ошибка: неверная страница", show_alert=True)
+        return
+    
+    await callback.message.edit_reply_markup(
+        reply_markup=await get_specialties_keyboard(show_back=show_back != "0", page=int(page))
+    )
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith("spec_"))
 async def set_specialty(callback: CallbackQuery):
     """Установка специальности для пользователя"""
@@ -65,22 +84,19 @@ async def set_specialty(callback: CallbackQuery):
     
     if is_teacher:
         # Для преподавателя просто показываем расписание выбранной специальности
-        schedules = await get_schedules_by_specialty(specialty_name)
-        text = f"📋 <b>Расписание для специальности: {specialty_name}</b>\n\n"
-        text += format_schedules_list(schedules, "")
-        
-        await callback.message.edit_text(
-            text,
-            reply_markup=await get_main_menu_keyboard(is_teacher=True)
+        await show_schedule(
+            callback.message,
+            render('schedule_specialty', specialty=specialty_name),
+            specialty_name,
+            reply_markup=KEYBOARDS['teacher_menu']
         )
     else:
         # Для студентов устанавливаем специальность
         await update_user_specialty(user_id, specialty_name)
         
         await callback.message.edit_text(
-            f"✅ Специальность установлена: <b>{specialty_name}</b>\n\n"
-            "Теперь вы можете просматривать расписание.",
-            reply_markup=await get_main_menu_keyboard(is_teacher=False)
+            render('specialty_set', specialty=specialty_name),
+            reply_markup=KEYBOARDS['student_menu']
         )
     
     await callback.answer()
@@ -90,30 +106,27 @@ async def set_specialty(callback: CallbackQuery):
 async def today_schedule(callback: CallbackQuery):
     """Расписание на сегодня"""
     user_id = callback.from_user.id
-    user = await get_user(user_id)
+    context = await get_or_create_user_context(
+        user_id, role='teacher' if user_id == TEACHER_ID else 'student'
+    )
+    user = context['user']
     
-    if not user or not user.get('specialty'):
+    if not user.get('specialty'):
         await callback.message.edit_text(
             "❌ Сначала выберите специальность!",
-            reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
+            reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
         )
         await callback.answer()
         return
     
-    # Определяем день недели
-    days = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
-    today = datetime.now().weekday()
-    day_name = days[today]
+    day_name = WEEKDAYS[context['weekday']]
     
-    schedules = await get_schedules_by_specialty(user['specialty'], day_name)
-    
-    text = f"📅 <b>Расписание на сегодня ({day_name})</b>\n"
-    text += f"Специальность: {user['specialty']}\n\n"
-    text += format_schedules_list(schedules, "")
-    
-    await callback.message.edit_text(
-        text,
-        reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
+    # Записи дня уже в кэше выборок после get_or_create_user_context
+    await show_schedule(
+        callback.message,
+        render('schedule_today', day=day_name, specialty=user['specialty']),
+        user['specialty'], day_name,
+        reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
     )
     await callback.answer()
 
@@ -127,14 +140,14 @@ async def week_schedule(callback: CallbackQuery):
     if not user or not user.get('specialty'):
         await callback.message.edit_text(
             "❌ Сначала выберите специальность!",
-            reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
+            reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
         )
         await callback.answer()
         return
     
     await callback.message.edit_text(
         "📅 Выберите день недели:",
-        reply_markup=get_days_keyboard()
+        reply_markup=KEYBOARDS['days']
     )
     await callback.answer()
 
@@ -148,7 +161,7 @@ async def day_schedule(callback: CallbackQuery):
     if not user or not user.get('specialty'):
         await callback.message.edit_text(
             "❌ Сначала выберите специальность!",
-            reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
+            reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
         )
         await callback.answer()
         return
@@ -156,20 +169,41 @@ async def day_schedule(callback: CallbackQuery):
     day_param = callback.data.replace("day_", "")
     
     if day_param == "all":
-        schedules = await get_schedules_by_specialty(user['specialty'])
+        day = None
         day_name = "Вся неделя"
     else:
-        schedules = await get_schedules_by_specialty(user['specialty'], day_param)
-        day_name = day_param
+        day = day_name = day_param
     
-    text = f"📅 <b>Расписание на {day_name}</b>\n"
-    text += f"Специальность: {user['specialty']}\n\n"
-    text += format_schedules_list(schedules, "")
+    await show_schedule(
+        callback.message,
+        render('schedule_day', day=day_name, specialty=user['specialty']),
+        user['specialty'], day,
+        reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "week_image")
+async def week_image(callback: CallbackQuery):
+    """Расписание на неделю картинкой (по группе пользователя, если она задана)"""
+    user_id = callback.from_user.id
+    user = await get_user(user_id)
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
+    if not user or not user.get('specialty'):
+        await callback.message.edit_text(
+            "❌ Сначала выберите специальность!",
+            reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
+        )
+        await callback.answer()
+        return
+    
+    sent = await send_week_image(
+        callback.message, user['specialty'], user.get('user_group'),
+        reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
     )
+    if sent is None:
+        await callback.answer("❌ Расписание на неделю не найдено", show_alert=True)
+        return
     await callback.answer()
 
 
@@ -196,20 +230,39 @@ async def process_search(message: Message, state: FSMContext):
     else:
         schedules = await search_schedules(query)
     
+    reply_markup = main_menu_keyboard(user_id == TEACHER_ID)
     if schedules:
-        text = f"🔍 <b>Результаты поиска по запросу: {query}</b>\n\n"
-        text += format_schedules_list(schedules, "")
+        # Результаты уже упорядочены по релевантности - самые подходящие на первой странице
+        await show_paged(
+            message, render('search_results', query=query), schedules,
+            reply_markup, edit=False, sort=False
+        )
     else:
-        text = f"❌ По запросу '{query}' ничего не найдено"
-    
-    await message.answer(
-        text,
-        reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
-    )
+        await message.answer(render('search_empty', query=query), reply_markup=reply_markup)
     
     await state.clear()
 
 
+@router.callback_query(F.data.startswith("page_"))
+async def flip_page(callback: CallbackQuery):
+    """Листание страниц длинного списка (без обращения к БД)"""
+    page = callback.data.replace("page_", "")
+    if page == "current":
+        await callback.answer()
+        return
+    
+    result = None
+    if page.isdigit():
+        result = get_page(callback.message.chat.id, callback.message.message_id, int(page))
+    if result is None:
+        await callback.answer("⌛ Список устарел, откройте его заново", show_alert=True)
+        return
+    
+    text, keyboard = result
+    await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
+
+
 @router.callback_query(F.data == "main_menu")
 async def back_to_main(callback: CallbackQuery):
     """Вернуться в главное меню"""
@@ -222,7 +275,7 @@ async def back_to_main(callback: CallbackQuery):
     
     await callback.message.edit_text(
         text,
-        reply_markup=await get_main_menu_keyboard(is_teacher=is_teacher)
+        reply_markup=main_menu_keyboard(is_teacher)
     )
     await callback.answer()
 
@@ -236,7 +289,7 @@ async def change_group_start(callback: CallbackQuery, state: FSMContext):
     current_group = user.get('user_group') if user else None
     text = "👥 Введите номер вашей группы:"
     if current_group:
-        text += f"\n\nТекущая группа: <b>{current_group}</b>"
+        text += render('group_current', group=current_group)
     
     await callback.message.edit_text(text)
     await state.set_state(GroupState.waiting_for_group)
@@ -252,8 +305,8 @@ async def change_group_process(message: Message, state: FSMContext):
     await update_user_group(user_id, group)
     
     await message.answer(
-        f"✅ Группа установлена: <b>{group}</b>",
-        reply_markup=await get_main_menu_keyboard(is_teacher=(user_id == TEACHER_ID))
+        render('group_set', group=group),
+        reply_markup=main_menu_keyboard(user_id == TEACHER_ID)
     )
     
     await state.clear()
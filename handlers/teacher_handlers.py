@@ -1,22 +1,35 @@
+import asyncio
+import logging
+from typing import Callable
+
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from functools import wraps
-from config import TEACHER_ID
+from config import TEACHER_ID, VIEW_ALL_PAGE_SIZE, IMPORT_PROGRESS_INTERVAL, EXCEL_UPLOAD_MAX_SIZE
 from database.db import (
-    add_schedule, get_all_schedules, delete_schedule, get_all_specialties,
+    add_schedule, get_schedules_page, delete_schedule, get_all_specialties,
     add_specialty, update_schedule, get_schedule_by_id
 )
 from keyboards.inline import (
-    get_main_menu_keyboard, get_teacher_manage_keyboard, get_specialties_keyboard,
-    get_confirm_keyboard
+    KEYBOARDS, get_specialties_keyboard,
+    get_confirm_keyboard, get_schedules_page_keyboard, get_upload_specialty_keyboard
 )
 from utils.formatters import format_schedules_list, format_schedule
-from utils.excel_parser import load_all_excel_files
+from utils.pagination import MESSAGE_LIMIT, split_pages, text_length
+from utils.excel_parser import import_excel_upload, is_excel_filename, specialty_from_filename
+from utils.import_jobs import ImportJob, import_jobs
+from utils.templates import render
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Ссылки на задачи обновления прогресса импорта, чтобы их не собрал GC
+_progress_tasks = set()
+
 
 class AddScheduleState(StatesGroup):
     waiting_for_specialty = State()
@@ -38,6 +51,10 @@ class AddSpecialtyState(StatesGroup):
     waiting_for_name = State()
 
 
+class UploadExcelState(StatesGroup):
+    waiting_for_specialty = State()
+
+
 from functools import wraps
 
 def check_teacher(func):
@@ -57,8 +74,10 @@ async def teacher_manage(callback: CallbackQuery):
     """Меню управления для преподавателя"""
     await callback.message.edit_text(
         "👨‍🏫 <b>Панель управления</b>\n\n"
-        "Выберите действие:",
-        reply_markup=await get_teacher_manage_keyboard()
+        "Выберите действие.\n"
+        "Чтобы обновить расписание, можно прислать .xls/.xlsx файл "
+        "(специальность - в подписи или по имени файла).",
+        reply_markup=KEYBOARDS['teacher_manage']
     )
     await callback.answer()
 
@@ -111,8 +130,7 @@ async def teacher_add_specialty(callback: CallbackQuery, state: FSMContext):
     specialty_name = spec['name']
     await state.update_data(specialty=specialty_name)
     await callback.message.edit_text(
-        f"✅ Специальность: <b>{specialty_name}</b>\n\n"
-        "Введите день недели (например: Понедельник):"
+        render('add_specialty_chosen', specialty=specialty_name)
     )
     await state.set_state(AddScheduleState.waiting_for_day)
     await callback.answer()
@@ -181,74 +199,234 @@ async def teacher_add_group(message: Message, state: FSMContext):
     
     await message.answer(
         "✅ Расписание успешно добавлено!",
-        reply_markup=await get_main_menu_keyboard(is_teacher=True)
+        reply_markup=KEYBOARDS['teacher_menu']
     )
     
     await state.clear()
 
 
-@router.callback_query(F.data == "teacher_view_all")
-@check_teacher
-async def teacher_view_all(callback: CallbackQuery):
-    """Просмотр всех расписаний"""
-    schedules = await get_all_schedules()
+async def show_schedules_page(callback: CallbackQuery, after_key: int = None, before_key: int = None):
+    """Показать одну страницу всех расписаний"""
+    page = await get_schedules_page(after_key=after_key, before_key=before_key, limit=VIEW_ALL_PAGE_SIZE)
+    schedules = page['schedules']
+    prev_key, next_key = page['prev_key'], page['next_key']
     
     if not schedules:
         text = "❌ Расписания не найдены"
     else:
-        text = f"📋 <b>Все расписания</b> (всего: {len(schedules)})\n\n"
-        text += format_schedules_list(schedules, "")
-    
-    # Разбиваем на части, если сообщение слишком длинное
-    if len(text) > 4000:
-        text = text[:4000] + "\n\n... (сообщение обрезано, используйте поиск)"
+        header = "📋 <b>Все расписания</b>\n\n"
+        # Страница ограничена по числу записей, но длинные записи могут не поместиться
+        # в сообщение - тогда показываем часть страницы, а ключ навигации сдвигается на нее
+        parts = split_pages(schedules, MESSAGE_LIMIT - text_length(header))
+        if len(parts) > 1:
+            start, end = parts[-1] if before_key is not None else parts[0]
+            if start > 0:
+                prev_key = schedules[start]['id']
+            if end < len(schedules):
+                next_key = schedules[end - 1]['id']
+            schedules = schedules[start:end]
+        text = header + format_schedules_list(schedules, "")
     
     await callback.message.edit_text(
         text,
-        reply_markup=get_teacher_manage_keyboard()
+        reply_markup=get_schedules_page_keyboard(prev_key, next_key)
     )
     await callback.answer()
 
 
+@router.callback_query(F.data == "teacher_view_all")
+@check_teacher
+async def teacher_view_all(callback: CallbackQuery):
+    """Просмотр всех расписаний (первая страница)"""
+    await show_schedules_page(callback)
+
+
+@router.callback_query(F.data.startswith("view_all_"))
+@check_teacher
+async def teacher_view_all_page(callback: CallbackQuery):
+    """Переход между страницами всех расписаний"""
+    direction, _, key = callback.data.replace("view_all_", "").partition("_")
+    try:
+        key = int(key)
+    except ValueError:
+        await callback.answer("❌ Ошибка: неверная страница", show_alert=True)
+        return
+    
+    if direction == "prev":
+        await show_schedules_page(callback, before_key=key)
+    else:
+        await show_schedules_page(callback, after_key=key)
+
+
+def _format_import_progress(job: ImportJob, position: int = 0) -> str:
+    """Текст сообщения с состоянием задачи импорта"""
+    if job.status == ImportJob.QUEUED:
+        return (
+            f"📤 Импорт #{job.id} поставлен в очередь.\n\n"
+            f"Задач перед ним: <b>{position}</b>"
+        )
+    return (
+        f"📤 Импорт #{job.id} выполняется...\n\n"
+        f"Файлов обработано: <b>{job.files_done}/{job.files_total}</b>\n"
+        f"Изменено записей: <b>{job.rows_added}</b>\n"
+        f"Скорость: {job.rows_per_sec:.0f} строк/с"
+    )
+
+
+def _format_import_done(job: ImportJob) -> str:
+    """Итог импорта из папок"""
+    if job.rows_added > 0:
+        return (
+            "✅ Загрузка завершена!\n\n"
+            f"Изменено записей в расписании: <b>{job.rows_added}</b>\n"
+            f"Файлов обработано: {job.files_done}, время: {job.elapsed:.1f} с\n\n"
+            "Файлы успешно обработаны."
+        )
+    return (
+        "⚠️ Загрузка завершена, изменений в расписании нет.\n\n"
+        "Файлы не изменились с прошлой загрузки или не содержат записей - "
+        "проверьте формат файлов в папках '1' и '2'."
+    )
+
+
+async def _report_import_progress(message: Message, job: ImportJob,
+                                  format_done: Callable[[ImportJob], str] = _format_import_done):
+    """Обновлять сообщение с прогрессом, пока задача не завершится
+
+    Итог успешной задачи формирует format_done.
+    """
+    last_text = None
+    while not await job.wait(timeout=IMPORT_PROGRESS_INTERVAL):
+        text = _format_import_progress(job, import_jobs.position(job))
+        if text == last_text:
+            continue
+        try:
+            await message.edit_text(text)
+            last_text = text
+        except TelegramBadRequest as e:
+            logger.debug(f"Не удалось обновить прогресс импорта #{job.id}: {e}")
+    
+    if job.status == ImportJob.FAILED:
+        text = (
+            render('import_failed', error=job.error)
+            + "\n\nПроверьте логи для подробностей."
+        )
+    else:
+        text = format_done(job)
+    try:
+        await message.edit_text(text, reply_markup=KEYBOARDS['teacher_manage'])
+    except TelegramBadRequest:
+        # Сообщение удалено или слишком старое - отправляем новое
+        await message.answer(text, reply_markup=KEYBOARDS['teacher_manage'])
+
+
 @router.callback_query(F.data == "teacher_upload_excel")
 @check_teacher
 async def teacher_upload_excel(callback: CallbackQuery):
-    """Загрузка Excel файлов"""
-    await callback.message.edit_text("📤 Загрузка Excel файлов...\n\nЭто может занять некоторое время.")
+    """Загрузка Excel файлов
+
+    Импорт ставится в очередь фоновых задач, обработчик сразу возвращается,
+    а прогресс периодически обновляется в том же сообщении.
+    """
+    job = import_jobs.submit()
+    await callback.message.edit_text(_format_import_progress(job, import_jobs.position(job)))
     await callback.answer()
     
+    task = asyncio.create_task(_report_import_progress(callback.message, job))
+    _progress_tasks.add(task)
+    task.add_done_callback(_progress_tasks.discard)
+
+
+async def _import_uploaded_file(message: Message, file_id: str, file_name: str, specialty: str):
+    """Скачать присланный файл в память и поставить его импорт в очередь
+
+    Как и импорт из папок, файл разбирается и синхронизируется задачей
+    очереди import_jobs, а прогресс обновляется в сообщении о загрузке.
+    """
+    status = await message.answer(render('upload_started', file_name=file_name, specialty=specialty))
     try:
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        logger.info("Начало загрузки Excel файлов")
-        total_added = await load_all_excel_files()
-        logger.info(f"Загрузка завершена. Добавлено записей: {total_added}")
-        
-        if total_added > 0:
-            await callback.message.edit_text(
-                f"✅ Загрузка завершена!\n\n"
-                f"Добавлено записей в расписание: <b>{total_added}</b>\n\n"
-                f"Файлы успешно обработаны.",
-                reply_markup=await get_teacher_manage_keyboard()
-            )
-        else:
-            await callback.message.edit_text(
-                f"⚠️ Загрузка завершена, но не было добавлено записей.\n\n"
-                f"Проверьте формат файлов в папках '1' и '2'.",
-                reply_markup=await get_teacher_manage_keyboard()
-            )
+        buffer = await message.bot.download(file_id)
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        logger.error(f"Ошибка при загрузке Excel: {error_details}")
-        
-        await callback.message.edit_text(
-            f"❌ Ошибка при загрузке:\n\n"
-            f"<code>{str(e)}</code>\n\n"
-            f"Проверьте логи для подробностей.",
-            reply_markup=await get_teacher_manage_keyboard()
+        logger.exception(f"Не удалось скачать присланный файл {file_name}")
+        await status.edit_text(
+            render('import_failed', error=e),
+            reply_markup=KEYBOARDS['teacher_manage']
+        )
+        return
+    
+    job = import_jobs.submit(
+        loader=import_excel_upload, content=buffer.getvalue(), filename=file_name, specialty_name=specialty
+    )
+    await status.edit_text(_format_import_progress(job, import_jobs.position(job)))
+    
+    def format_done(job: ImportJob) -> str:
+        stats = job.result
+        if stats is None:
+            return render('upload_unchanged', file_name=file_name)
+        return render(
+            'upload_done', specialty=specialty, inserted=stats['inserted'], updated=stats['updated'],
+            deleted=stats['deleted'], unchanged=stats['unchanged']
         )
+    
+    task = asyncio.create_task(_report_import_progress(status, job, format_done))
+    _progress_tasks.add(task)
+    task.add_done_callback(_progress_tasks.discard)
+
+
+@router.message(F.document, F.from_user.id == TEACHER_ID)
+async def teacher_upload_document(message: Message, state: FSMContext):
+    """Excel файл, присланный преподавателем
+
+    Специальность берется из подписи к файлу, иначе запрашивается
+    (с вариантом взять ее из имени файла).
+    """
+    document = message.document
+    file_name = document.file_name or ''
+    if not is_excel_filename(file_name):
+        await message.answer("⚠️ Поддерживаются только файлы .xls и .xlsx")
+        return
+    if document.file_size and document.file_size > EXCEL_UPLOAD_MAX_SIZE:
+        await message.answer(
+            f"⚠️ Файл слишком большой (максимум {EXCEL_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ)"
+        )
+        return
+    
+    await state.clear()
+    specialty = (message.caption or '').strip()
+    if specialty:
+        await _import_uploaded_file(message, document.file_id, file_name, specialty)
+        return
+    
+    await state.update_data(file_id=document.file_id, file_name=file_name)
+    await state.set_state(UploadExcelState.waiting_for_specialty)
+    await message.answer(
+        render('upload_received', file_name=file_name),
+        reply_markup=get_upload_specialty_keyboard(specialty_from_filename(file_name))
+    )
+
+
+@router.callback_query(UploadExcelState.waiting_for_specialty, F.data == "upload_use_filename")
+@check_teacher
+async def teacher_upload_use_filename(callback: CallbackQuery, state: FSMContext):
+    """Специальность присланного файла - из имени файла"""
+    data = await state.get_data()
+    await state.clear()
+    await callback.answer()
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await _import_uploaded_file(
+        callback.message, data['file_id'], data['file_name'], specialty_from_filename(data['file_name'])
+    )
+
+
+@router.message(UploadExcelState.waiting_for_specialty, F.text)
+async def teacher_upload_specialty_name(message: Message, state: FSMContext):
+    """Специальность присланного файла, введенная вручную"""
+    data = await state.get_data()
+    await state.clear()
+    if message.text.lower() == '/cancel':
+        await message.answer("❌ Отменено", reply_markup=KEYBOARDS['teacher_manage'])
+        return
+    await _import_uploaded_file(message, data['file_id'], data['file_name'], message.text.strip())
 
 
 @router.callback_query(F.data == "teacher_manage_specs")
@@ -260,10 +438,10 @@ async def teacher_manage_specs(callback: CallbackQuery, state: FSMContext):
     text = "📚 <b>Управление специальностями</b>\n\n"
     text += "Текущие специальности:\n"
     for spec in specialties:
-        text += f"• {spec['name']}\n"
+        text += render('specialty_item', name=spec['name'])
     text += "\nВведите название новой специальности (или /cancel для отмены):"
     
-    keyboard = await get_teacher_manage_keyboard()
+    keyboard = KEYBOARDS['teacher_manage']
     await callback.message.edit_text(text, reply_markup=keyboard)
     await state.set_state(AddSpecialtyState.waiting_for_name)
     await callback.answer()
@@ -275,15 +453,15 @@ async def teacher_add_specialty_name(message: Message, state: FSMContext):
     if message.text.lower() == '/cancel':
         await message.answer(
             "❌ Отменено",
-            reply_markup=await get_main_menu_keyboard(is_teacher=True)
+            reply_markup=KEYBOARDS['teacher_menu']
         )
         await state.clear()
         return
     
     await add_specialty(message.text)
     await message.answer(
-        f"✅ Специальность '{message.text}' добавлена!",
-        reply_markup=await get_main_menu_keyboard(is_teacher=True)
+        render('specialty_added', specialty=message.text),
+        reply_markup=KEYBOARDS['teacher_menu']
     )
     await state.clear()
 
@@ -1,7 +1,7 @@
 from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from keyboards.inline import get_main_menu_keyboard
+from keyboards.inline import main_menu_keyboard
 from config import TEACHER_ID
 
 router = Router()
@@ -25,7 +25,7 @@ async def handle_unknown_message(message: Message, state: FSMContext):
     await message.answer(
         "🤔 К сожалению, я не знаю такой команды...\n\n"
         "Используйте кнопки меню для навигации.",
-        reply_markup=await get_main_menu_keyboard(is_teacher=is_teacher)
+        reply_markup=main_menu_keyboard(is_teacher)
     )
 
 
@@ -43,5 +43,5 @@ async def handle_unknown_callback(callback: CallbackQuery):
     await callback.message.edit_text(
         "🤔 К сожалению, я не знаю такой команды...\n\n"
         "Используйте кнопки меню для навигации.",
-        reply_markup=await get_main_menu_keyboard(is_teacher=is_teacher)
+        reply_markup=main_menu_keyboard(is_teacher)
     )
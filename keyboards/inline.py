@@ -1,48 +1,81 @@
+from types import MappingProxyType
+from typing import Dict, List, Mapping
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from database.db import get_all_specialties
+from config import SPECIALTY_KEYBOARD_PAGE_SIZE
+from database.db import get_specialty_catalog
 
 
-async def get_specialties_keyboard(show_back: bool = True):
-    """Клавиатура для выбора специальности"""
-    specialties = await get_all_specialties()
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[])
-    
-    # Группируем кнопки по 2 в ряд
-    row = []
-    for spec in specialties:
-        # Используем ID вместо названия, чтобы избежать превышения лимита callback_data (64 байта)
-        spec_id = spec.get('id')
-        if spec_id is None:
-            # Если нет ID, используем хеш названия как fallback
-            import hashlib
-            spec_id = int(hashlib.md5(spec['name'].encode('utf-8')).hexdigest()[:8], 16)
+# Готовые страницы клавиатуры выбора специальности по show_back;
+# строятся заново при смене версии каталога специальностей
+_specialty_keyboards: Dict[bool, List[InlineKeyboardMarkup]] = {}
+_specialty_keyboards_version = None
+
+
+def _build_specialty_keyboards(specialties: list, show_back: bool) -> List[InlineKeyboardMarkup]:
+    """Все страницы клавиатуры выбора специальности"""
+    page_size = max(SPECIALTY_KEYBOARD_PAGE_SIZE, 1)
+    total = max((len(specialties) + page_size - 1) // page_size, 1)
+    keyboards = []
+    for page in range(total):
+        rows = []
         
-        # Ограничиваем длину текста кнопки для лучшего отображения
-        button_text = spec['name']
-        if len(button_text) > 30:
-            button_text = button_text[:27] + "..."
+        # Группируем кнопки по 2 в ряд
+        row = []
+        for spec in specialties[page * page_size:(page + 1) * page_size]:
+            # Ограничиваем длину текста кнопки для лучшего отображения
+            button_text = spec['name']
+            if len(button_text) > 30:
+                button_text = button_text[:27] + "..."
+            
+            # Используем ID вместо названия, чтобы избежать превышения лимита callback_data (64 байта)
+            row.append(InlineKeyboardButton(text=button_text, callback_data=f"spec_{spec['id']}"))
+            if len(row) == 2:
+                rows.append(row)
+                row = []
+        if row:
+            rows.append(row)
         
-        row.append(InlineKeyboardButton(
-            text=button_text,
-            callback_data=f"spec_{spec_id}"
-        ))
-        if len(row) == 2:
-            keyboard.inline_keyboard.append(row)
-            row = []
-    if row:
-        keyboard.inline_keyboard.append(row)
-    
-    # Добавляем кнопку "Назад"
-    if show_back:
-        keyboard.inline_keyboard.append([
-            InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
-        ])
+        if total > 1:
+            nav = []
+            if page > 0:
+                nav.append(InlineKeyboardButton(
+                    text="⬅️", callback_data=f"specs_page_{page - 1}_{int(show_back)}"
+                ))
+            nav.append(InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data="page_current"))
+            if page < total - 1:
+                nav.append(InlineKeyboardButton(
+                    text="➡️", callback_data=f"specs_page_{page + 1}_{int(show_back)}"
+                ))
+            rows.append(nav)
+        
+        # Добавляем кнопку "Назад"
+        if show_back:
+            rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")])
+        keyboards.append(InlineKeyboardMarkup(inline_keyboard=rows))
+    return keyboards
+
+
+async def get_specialties_keyboard(show_back: bool = True, page: int = 0):
+    """Клавиатура для выбора специальности (страница page)
+
+    Страницы по SPECIALTY_KEYBOARD_PAGE_SIZE кнопок строятся один раз
+    для версии каталога специальностей и общие для всех пользователей.
+    """
+    global _specialty_keyboards_version
+    catalog = await get_specialty_catalog()
+    if catalog['version'] != _specialty_keyboards_version:
+        _specialty_keyboards.clear()
+        _specialty_keyboards_version = catalog['version']
     
-    return keyboard
+    keyboards = _specialty_keyboards.get(show_back)
+    if keyboards is None:
+        keyboards = _build_specialty_keyboards(catalog['specialties'], show_back)
+        _specialty_keyboards[show_back] = keyboards
+    return keyboards[min(max(page, 0), len(keyboards) - 1)]
 
 
-def get_days_keyboard():
-    """Клавиатура для выбора дня недели"""
+def _days_rows() -> list:
+    """Дни недели по 2 в ряд, неделя картинкой и кнопка «Назад»"""
     days = [
         ("Понедельник", "day_Понедельник"),
         ("Вторник", "day_Вторник"),
@@ -53,56 +86,87 @@ def get_days_keyboard():
         ("Воскресенье", "day_Воскресенье"),
         ("Вся неделя", "day_all")
     ]
-    
+    buttons = [InlineKeyboardButton(text=day_name, callback_data=callback_data) for day_name, callback_data in days]
+    rows = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    rows.append([InlineKeyboardButton(text="🖼 Неделя картинкой", callback_data="week_image")])
+    rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")])
+    return rows
+
+
+# Статические клавиатуры: строятся один раз при загрузке модуля и общие
+# для всех сообщений, поэтому их нельзя изменять (для навигации поверх
+# них строится новая клавиатура, см. get_page_nav_keyboard)
+KEYBOARDS: Mapping[str, InlineKeyboardMarkup] = MappingProxyType({
+    # Главное меню студента
+    'student_menu': InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📚 Выбрать специальность", callback_data="choose_specialty")],
+        [InlineKeyboardButton(text="📅 Расписание на сегодня", callback_data="today_schedule")],
+        [InlineKeyboardButton(text="📋 Расписание на неделю", callback_data="week_schedule")],
+        [InlineKeyboardButton(text="🔍 Поиск", callback_data="search_schedule")],
+        [InlineKeyboardButton(text="👥 Изменить группу", callback_data="change_group")]
+    ]),
+    # Главное меню преподавателя
+    'teacher_menu': InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="➕ Добавить расписание", callback_data="teacher_add")],
+        [InlineKeyboardButton(text="📝 Управление", callback_data="teacher_manage")]
+    ]),
+    # Выбор дня недели
+    'days': InlineKeyboardMarkup(inline_keyboard=_days_rows()),
+    # Управление для преподавателя
+    'teacher_manage': InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="📚 Просмотр расписания", callback_data="choose_specialty")],
+        [InlineKeyboardButton(text="📋 Все расписания", callback_data="teacher_view_all")],
+        [InlineKeyboardButton(text="📤 Загрузить Excel", callback_data="teacher_upload_excel")],
+        [InlineKeyboardButton(text="📚 Управление специальностями", callback_data="teacher_manage_specs")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")]
+    ]),
+})
+
+
+def main_menu_keyboard(is_teacher: bool = False) -> InlineKeyboardMarkup:
+    """Главное меню преподавателя или студента"""
+    return KEYBOARDS['teacher_menu' if is_teacher else 'student_menu']
+
+
+def get_schedules_page_keyboard(prev_key: int = None, next_key: int = None):
+    """Навигация по страницам всех расписаний (в callback_data - ключ страницы)"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[])
+    
     row = []
-    for day_name, callback_data in days:
-        row.append(InlineKeyboardButton(text=day_name, callback_data=callback_data))
-        if len(row) == 2:
-            keyboard.inline_keyboard.append(row)
-            row = []
+    if prev_key is not None:
+        row.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=f"view_all_prev_{prev_key}"))
+    if next_key is not None:
+        row.append(InlineKeyboardButton(text="Вперед ➡️", callback_data=f"view_all_next_{next_key}"))
     if row:
         keyboard.inline_keyboard.append(row)
     
-    # Добавляем кнопку "Назад"
     keyboard.inline_keyboard.append([
-        InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
+        InlineKeyboardButton(text="🔙 Панель управления", callback_data="teacher_manage")
     ])
     
     return keyboard
 
 
-async def get_main_menu_keyboard(is_teacher: bool = False):
-    """Главное меню"""
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[])
-    
-    if is_teacher:
-        # Меню для преподавателя
-        keyboard.inline_keyboard = [
-            [InlineKeyboardButton(text="➕ Добавить расписание", callback_data="teacher_add")],
-            [InlineKeyboardButton(text="📝 Управление", callback_data="teacher_manage")]
-        ]
-    else:
-        # Меню для студентов
-        keyboard.inline_keyboard = [
-            [InlineKeyboardButton(text="📚 Выбрать специальность", callback_data="choose_specialty")],
-            [InlineKeyboardButton(text="📅 Расписание на сегодня", callback_data="today_schedule")],
-            [InlineKeyboardButton(text="📋 Расписание на неделю", callback_data="week_schedule")],
-            [InlineKeyboardButton(text="🔍 Поиск", callback_data="search_schedule")],
-            [InlineKeyboardButton(text="👥 Изменить группу", callback_data="change_group")]
-        ]
+def get_page_nav_keyboard(page: int, total: int, base: InlineKeyboardMarkup = None):
+    """Навигация по страницам длинного сообщения над кнопками base"""
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="⬅️", callback_data=f"page_{page - 1}"))
+    row.append(InlineKeyboardButton(text=f"{page + 1}/{total}", callback_data="page_current"))
+    if page < total - 1:
+        row.append(InlineKeyboardButton(text="➡️", callback_data=f"page_{page + 1}"))
     
-    return keyboard
+    rows = [row]
+    if base is not None:
+        rows.extend(base.inline_keyboard)
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-async def get_teacher_manage_keyboard():
-    """Клавиатура управления для преподавателя"""
+def get_upload_specialty_keyboard(suggested: str):
+    """Выбор специальности для присланного Excel файла: из имени файла"""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📚 Просмотр расписания", callback_data="choose_specialty")],
-        [InlineKeyboardButton(text="📋 Все расписания", callback_data="teacher_view_all")],
-        [InlineKeyboardButton(text="📤 Загрузить Excel", callback_data="teacher_upload_excel")],
-        [InlineKeyboardButton(text="📚 Управление специальностями", callback_data="teacher_manage_specs")],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")]
+        [InlineKeyboardButton(text=f"📄 {suggested}", callback_data="upload_use_filename")],
+        [InlineKeyboardButton(text="🔙 Панель управления", callback_data="teacher_manage")]
     ])
 
 
@@ -1,10 +1,12 @@
 import asyncio
+import contextlib
 import logging
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from config import BOT_TOKEN
-from database.db import init_db, close_pool
+from config import BOT_TOKEN, POOL_STATS_LOG_INTERVAL, POOL_STATS_PATH, STATEMENT_STATS_LOG_TOP
+from database.db import init_db, close_pool, get_pool_stats, get_statement_stats
+from database.pool_metrics import write_snapshot
 from handlers import start_router, student_router, teacher_router, unknown_router
 
 # Настройка логирования
@@ -15,6 +17,29 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def log_pool_stats(interval: int):
+    """Периодическая запись метрик пула и подготовленных запросов в лог и в файл POOL_STATS_PATH (для API)"""
+    while True:
+        await asyncio.sleep(interval)
+        stats = get_pool_stats()
+        logger.info(
+            f"Пул БД: занято {stats['in_use']}, свободно {stats.get('idle')}, размер {stats.get('size')}, "
+            f"ожидание ср. {stats['avg_wait_ms']:.1f} мс / макс. {stats['max_wait_ms']:.1f} мс, "
+            f"таймаутов {stats['timeouts']}, гистограмма {stats['wait_histogram']}"
+        )
+        statements = get_statement_stats()
+        top = list(statements.items())[:STATEMENT_STATS_LOG_TOP]
+        if top:
+            logger.info("Запросы (самые затратные): " + "; ".join(
+                f"{name}: {item['calls']} выз., всего {item['total_ms']:.0f} мс, ср. {item['avg_ms']:.2f} мс"
+                for name, item in top
+            ))
+        try:
+            write_snapshot(POOL_STATS_PATH, dict(stats, statements=statements))
+        except OSError as e:
+            logger.warning(f"Метрики пула не записаны в {POOL_STATS_PATH}: {e}")
+
+
 async def main():
     """Основная функция запуска бота"""
     if not BOT_TOKEN:
@@ -45,11 +70,22 @@ async def main():
     dp.include_router(teacher_router)
     dp.include_router(unknown_router)
     
+    stats_task = None
+    if POOL_STATS_LOG_INTERVAL > 0:
+        stats_task = asyncio.create_task(log_pool_stats(POOL_STATS_LOG_INTERVAL))
+    
     logger.info("Бот запущен")
     
     # Запуск бота
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        await bot.delete_webhook(drop_pending_updates=True)
+        await dp.start_polling(bot)
+    finally:
+        # Останавливаем запись метрик до закрытия пула
+        if stats_task is not None:
+            stats_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await stats_task
 
 
 if __name__ == '__main__':
@@ -0,0 +1,232 @@
+"""
+Определение макета Excel файла: строка заголовков и номера колонок
+
+Макет вычисляется один раз для каждого вида строки заголовков и
+запоминается по ее сигнатуре (хэшу нормализованных заголовков) в кэше
+макетов, который сохраняется в EXCEL_LAYOUT_CACHE_PATH. Файлы одного
+шаблона распознаются по сигнатуре строки на известной позиции без
+поиска ключевых слов и разбора заголовков.
+
+Для нестандартных шаблонов макет задается вручную в файле
+EXCEL_LAYOUT_OVERRIDES_PATH - JSON список правил:
+
+    [
+        {"file": "Магистратура*.xlsx", "header_row": 3,
+         "columns": {"day": 0, "time": 1, "subject": 2, "teacher": 4}},
+        {"signature": "3f2a...", "columns": {"day": 1, "time": 0, "subject": 2}}
+    ]
+
+header_row - номер строки заголовков как в Excel (с 1), columns - номера
+колонок с 0. Правило "file" (шаблон имени файла) применяется без
+поиска заголовков, правило "signature" заменяет разбор найденной строки.
+"""
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from config import EXCEL_LAYOUT_CACHE_PATH, EXCEL_LAYOUT_OVERRIDES_PATH
+
+logger = logging.getLogger(__name__)
+
+# Поля записи, которые берутся из колонок файла
+LAYOUT_FIELDS = ('day', 'time', 'subject', 'teacher', 'room', 'group')
+
+# Ключевые слова строки заголовков
+HEADER_KEYWORDS = ('день', 'время', 'предмет', 'преподаватель', 'аудитория')
+
+# Подстроки заголовков для каждого поля; проверяются по порядку
+COLUMN_SYNONYMS = (
+    ('day', ('день',)),
+    ('time', ('время', 'час')),
+    ('subject', ('предмет', 'дисциплина')),
+    ('teacher', ('преподаватель', 'преп')),
+    ('room', ('аудитория', 'кабинет', 'комната')),
+    ('group', ('группа',)),
+)
+
+
+class Layout(NamedTuple):
+    # Индекс строки заголовков (с 0)
+    header_row: int
+    # Поле -> индекс колонки (None - колонки нет)
+    columns: Dict[str, Optional[int]]
+    signature: str
+    # 'override', 'cache' или 'detected'
+    source: str
+
+
+# Состояние процесса: загружается из файлов при первом обращении
+_cache: Optional[Dict[str, dict]] = None
+_overrides: List[dict] = []
+# Позиции строк заголовков известных макетов
+_known_rows: set = set()
+_stats = {'override': 0, 'cache': 0, 'detected': 0, 'not_found': 0}
+
+
+def header_signature(cells: List[str]) -> str:
+    """Сигнатура строки заголовков: хэш заголовков без регистра и пустых хвостов"""
+    normalized = [str(cell).strip().lower() for cell in cells]
+    while normalized and not normalized[-1]:
+        normalized.pop()
+    return hashlib.sha1('\x1f'.join(normalized).encode('utf-8')).hexdigest()[:16]
+
+
+def is_header_row(cells: List[str]) -> bool:
+    """Есть ли в строке ключевые слова заголовков"""
+    text = ' '.join(cells).lower()
+    return any(keyword in text for keyword in HEADER_KEYWORDS)
+
+
+def map_columns(headers: List[str]) -> Dict[str, Optional[int]]:
+    """Номера колонок по заголовкам (если подходят несколько - последняя)"""
+    columns = dict.fromkeys(LAYOUT_FIELDS)
+    for idx, header in enumerate(headers):
+        header_lower = str(header).lower()
+        for field, synonyms in COLUMN_SYNONYMS:
+            if any(synonym in header_lower for synonym in synonyms):
+                columns[field] = idx
+                break
+    return columns
+
+
+def _columns_from_json(columns: dict) -> Dict[str, Optional[int]]:
+    result = dict.fromkeys(LAYOUT_FIELDS)
+    for field, idx in columns.items():
+        if field not in result:
+            raise ValueError(f"Неизвестное поле макета: {field}")
+        result[field] = None if idx is None else int(idx)
+    return result
+
+
+def _load():
+    """Загрузить кэш макетов и ручные правила (один раз на процесс)"""
+    global _cache, _overrides
+    if _cache is not None:
+        return
+
+    _cache = {}
+    try:
+        with open(EXCEL_LAYOUT_CACHE_PATH, encoding='utf-8') as f:
+            _cache = json.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"Кэш макетов {EXCEL_LAYOUT_CACHE_PATH} не прочитан: {e}")
+    _known_rows.update(entry['header_row'] for entry in _cache.values())
+
+    _overrides = []
+    try:
+        with open(EXCEL_LAYOUT_OVERRIDES_PATH, encoding='utf-8') as f:
+            _overrides = json.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.error(f"Ручные макеты {EXCEL_LAYOUT_OVERRIDES_PATH} не прочитаны: {e}")
+
+
+def reload_layouts():
+    """Перечитать кэш макетов и ручные правила при следующем разборе"""
+    global _cache
+    _cache = None
+    _known_rows.clear()
+
+
+def _save(signature: str, entry: dict):
+    """Дописать макет в файл кэша
+
+    Файл перечитывается и заменяется атомарно: воркеры пула процессов
+    пишут его независимо, и в худшем случае макет будет определен заново.
+    """
+    try:
+        try:
+            with open(EXCEL_LAYOUT_CACHE_PATH, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            stored = {}
+        stored[signature] = entry
+        tmp_path = f'{EXCEL_LAYOUT_CACHE_PATH}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, EXCEL_LAYOUT_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Кэш макетов {EXCEL_LAYOUT_CACHE_PATH} не сохранен: {e}")
+
+
+def file_override(file_name: Optional[str]) -> Optional[Layout]:
+    """Ручной макет для файла по шаблону имени"""
+    _load()
+    if not file_name:
+        return None
+    base_name = os.path.basename(file_name)
+    for rule in _overrides:
+        if 'file' in rule and fnmatch.fnmatch(base_name, rule['file']):
+            _stats['override'] += 1
+            return Layout(int(rule.get('header_row', 1)) - 1, _columns_from_json(rule['columns']),
+                          '', 'override')
+    return None
+
+
+def _known_layout(row_idx: int, signature: str) -> Optional[Layout]:
+    """Макет из правил по сигнатуре или из кэша"""
+    for rule in _overrides:
+        if rule.get('signature') == signature:
+            _stats['override'] += 1
+            return Layout(row_idx, _columns_from_json(rule['columns']), signature, 'override')
+
+    entry = _cache.get(signature)
+    if entry is not None and entry['header_row'] == row_idx:
+        _stats['cache'] += 1
+        return Layout(row_idx, entry['columns'], signature, 'cache')
+    return None
+
+
+def layout_for_header(row_idx: int, cells: List[str]) -> Layout:
+    """Макет для найденной строки заголовков: правило, кэш или разбор"""
+    _load()
+    signature = header_signature(cells)
+    layout = _known_layout(row_idx, signature)
+    if layout is not None:
+        return layout
+
+    columns = map_columns(cells)
+    entry = {'header_row': row_idx, 'columns': columns}
+    _cache[signature] = entry
+    _known_rows.add(row_idx)
+    _save(signature, entry)
+    _stats['detected'] += 1
+    logger.info(f"Новый макет Excel {signature} (строка заголовков {row_idx + 1}): {columns}")
+    return Layout(row_idx, columns, signature, 'detected')
+
+
+def find_layout(rows: Iterator[List[str]], file_name: str = None) -> Optional[Layout]:
+    """Прочитать строки до заголовков и вернуть макет (None - заголовков нет)
+
+    Итератор rows остается на первой строке данных. Строки на позициях
+    известных макетов сначала сверяются по сигнатуре, остальные - по
+    ключевым словам.
+    """
+    layout = file_override(file_name)
+    if layout is not None:
+        for _ in range(layout.header_row + 1):
+            if next(rows, None) is None:
+                break
+        return layout
+
+    for row_idx, cells in enumerate(rows):
+        if row_idx in _known_rows:
+            layout = _known_layout(row_idx, header_signature(cells))
+            if layout is not None:
+                return layout
+        if is_header_row(cells):
+            return layout_for_header(row_idx, cells)
+
+    _stats['not_found'] += 1
+    return None
+
+
+def get_layout_stats() -> Dict[str, int]:
+    """Сколько раз макет взят из правил, из кэша, определен заново или не найден"""
+    return dict(_stats, cached_layouts=len(_cache or {}))
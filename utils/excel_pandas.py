@@ -0,0 +1,121 @@
+"""
+Векторизованный разбор Excel файлов через pandas
+
+Лист читается в DataFrame целиком, строка заголовков и колонки
+определяются один раз, а очистка ячеек, отбор строк, разбор дня недели
+и времени выполняются операциями над колонками. Результат совпадает
+с потоковым разбором utils.excel_parser (engine='python'), но записи
+сразу содержат ключи сортировки weekday, time_start, time_end.
+"""
+import importlib.util
+import io
+import os
+
+import pandas as pd
+import xlrd
+
+from database.schedule_keys import parse_time_range, parse_weekday
+from utils.excel_layout import find_layout
+from utils.excel_parser import _StageTimer
+
+# python-calamine (необязательная зависимость) читает .xlsx в несколько раз быстрее openpyxl
+XLSX_READ_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+
+
+def _read_xlsx(file_path: str, content: bytes = None) -> pd.DataFrame:
+    """Первый лист .xlsx в виде строк, как в _open_xlsx_rows"""
+    source = io.BytesIO(content) if content is not None else file_path
+    df = pd.read_excel(source, sheet_name=0, header=None, dtype=object, engine=XLSX_READ_ENGINE)
+    # Пустые, нулевые и ложные значения ячеек - пустая строка
+    empty = df.isna() | df.eq(0) | df.eq('')
+    return df.astype(str).mask(empty, '').apply(lambda col: col.str.strip())
+
+
+def _read_xls(file_path: str, content: bytes = None) -> pd.DataFrame:
+    """Первый лист .xls в виде строк, как в _open_xls_rows"""
+    if content is not None:
+        workbook = xlrd.open_workbook(file_contents=content, on_demand=True)
+    else:
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        df = pd.DataFrame([sheet.row_values(row_idx) for row_idx in range(sheet.nrows)], dtype=object)
+    finally:
+        workbook.release_resources()
+    return df.astype(str).apply(lambda col: col.str.strip())
+
+
+# Расширение -> чтение первого листа
+_READERS = {
+    '.xlsx': _read_xlsx,
+    '.xls': _read_xls,
+}
+
+
+def _column(df: pd.DataFrame, col) -> pd.Series:
+    """Колонка с данными или пустые значения, если колонки нет"""
+    if col is None or col >= df.shape[1]:
+        return pd.Series('', index=df.index, dtype=object)
+    return df.iloc[:, col]
+
+
+def _map_unique(values: pd.Series, func) -> list:
+    """Применить func к каждому уникальному значению и разложить результат по строкам"""
+    codes, uniques = pd.factorize(values)
+    results = [func(value) for value in uniques]
+    return [results[code] for code in codes]
+
+
+def parse_workbook_pandas(file_path: str, specialty_name: str, timings: dict = None,
+                          content: bytes = None) -> list:
+    """Прочитать все строки расписания из файла
+
+    Возвращает кортежи в порядке SCHEDULE_RECORD_COLUMNS, дополненные
+    значениями weekday, time_start, time_end (порядок SCHEDULE_COPY_COLUMNS).
+    В timings (если передан) накапливается время этапов open, header и normalize,
+    content - содержимое файла в памяти (file_path - только для расширения).
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in _READERS:
+        return []
+    timer = _StageTimer(timings)
+    df = _READERS[ext](file_path, content)
+    timer.mark('open')
+    if df.empty:
+        return []
+
+    # Заголовки обычно в первых строках - перебираем строки только до них
+    layout = find_layout(df.itertuples(index=False, name=None), file_path)
+    timer.mark('header')
+    if layout is None:
+        return []
+    columns = layout.columns
+
+    data = df.iloc[layout.header_row + 1:]
+    day = _column(data, columns['day'])
+    time = _column(data, columns['time'])
+    subject = _column(data, columns['subject'])
+    keep = day.ne('') & time.ne('') & subject.ne('')
+    if not keep.any():
+        return []
+    data = data[keep]
+    day, time, subject = day[keep], time[keep], subject[keep]
+
+    def optional(col) -> list:
+        values = _column(data, col).astype(object)
+        return values.where(values.ne(''), None).tolist()
+
+    # Дней и интервалов времени в расписании немного - разбираем только уникальные
+    weekdays = _map_unique(day, parse_weekday)
+    time_ranges = _map_unique(time, parse_time_range)
+
+    records = [
+        (specialty_name, None, day_value, time_value, subject_value,
+         teacher, room, group, weekday_value, time_start, time_end)
+        for day_value, time_value, subject_value, teacher, room, group, weekday_value, (time_start, time_end)
+        in zip(day.tolist(), time.tolist(), subject.tolist(),
+               optional(columns['teacher']), optional(columns['room']), optional(columns['group']),
+               weekdays, time_ranges)
+    ]
+    timer.mark('normalize')
+    return records
@@ -1,210 +1,456 @@
+import io
 import os
+import time
+import hashlib
+import asyncio
 import logging
+from contextlib import contextmanager
+from itertools import islice
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Optional
 from openpyxl import load_workbook
 import xlrd
-from database.db import add_schedule, add_specialty
-from config import EXCEL_FOLDER_1, EXCEL_FOLDER_2
+from utils.excel_layout import find_layout
+from database.db import (
+    add_specialty, get_import_ledger, sync_specialty_schedules, replace_specialty_schedules
+)
+from config import (
+    EXCEL_FOLDER_1, EXCEL_FOLDER_2, EXCEL_IMPORT_BATCH_SIZE, EXCEL_IMPORT_WORKERS, EXCEL_PARSER_ENGINE,
+    EXCEL_IMPORT_MODE, EXCEL_IMPORT_PIPELINE
+)
 
 logger = logging.getLogger(__name__)
 
+# Движки разбора Excel (см. parse_workbook)
+EXCEL_PARSER_ENGINES = ('python', 'pandas')
 
-async def parse_excel_file(file_path: str, specialty_name: str):
-    """Парсинг Excel файла и добавление данных в БД"""
+# Режимы записи импортированных файлов (см. _sync_parsed_files)
+EXCEL_IMPORT_MODES = ('diff', 'replace')
+
+# Префикс записей журнала импорта для файлов, присланных боту
+UPLOAD_LEDGER_PREFIX = 'upload/'
+
+
+class _StageTimer:
+    """Накопление времени этапов разбора в словаре timings (для бенчмарков)
+
+    Если timings не передан, замеры не выполняются.
+    """
+
+    def __init__(self, timings: Optional[dict]):
+        self.timings = timings
+        self.started = time.perf_counter() if timings is not None else 0.0
+
+    def mark(self, stage: str):
+        """Отнести время с предыдущей отметки к этапу stage"""
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self.started
+        self.started = now
+
+
+@contextmanager
+def _open_xlsx_rows(file_path: str, content: bytes = None):
+    """Строки первого листа .xlsx в потоковом режиме (без загрузки всего файла)"""
+    wb = load_workbook(io.BytesIO(content) if content is not None else file_path,
+                       read_only=True, data_only=True)
+    try:
+        yield (
+            [str(cell).strip() if cell else '' for cell in row]
+            for row in wb.active.iter_rows(values_only=True)
+        )
+    finally:
+        # В режиме read_only книга держит файл открытым до close()
+        wb.close()
+
+
+@contextmanager
+def _open_xls_rows(file_path: str, content: bytes = None):
+    """Строки первого листа .xls, по строке целиком через row_values"""
+    if content is not None:
+        workbook = xlrd.open_workbook(file_contents=content, on_demand=True)
+    else:
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
     try:
-        # Определяем расширение файла
-        ext = os.path.splitext(file_path)[1].lower()
+        sheet = workbook.sheet_by_index(0)
+        yield (
+            [str(value).strip() for value in sheet.row_values(row_idx)]
+            for row_idx in range(sheet.nrows)
+        )
+    finally:
+        workbook.release_resources()
+
+
+# Расширение -> чтение строк первого листа
+_READERS = {
+    '.xlsx': _open_xlsx_rows,
+    '.xls': _open_xls_rows,
+}
+
+
+def _cell(row_values: list, col: Optional[int]) -> Optional[str]:
+    return row_values[col] if col is not None and col < len(row_values) else None
+
+
+def is_excel_filename(filename: str) -> bool:
+    """Поддерживается ли формат файла"""
+    return os.path.splitext(filename)[1].lower() in _READERS
+
+
+def iter_schedule_records(file_path: str, specialty_name: str, timings: dict = None,
+                          content: bytes = None):
+    """Потоковое чтение строк расписания из Excel файла
+
+    Файл читается за один проход: сначала определяется макет (строка
+    заголовков и колонки, см. utils.excel_layout), затем разбираются
+    следующие за заголовками строки. В памяти держится только
+    текущая строка. Возвращает кортежи в порядке SCHEDULE_RECORD_COLUMNS.
+    В timings (если передан) накапливается время этапов open, header
+    и normalize (чтение строк данных входит в normalize).
+    content - содержимое файла в памяти; тогда file_path нужен только
+    для определения формата по расширению.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in _READERS:
+        return
+    timer = _StageTimer(timings)
+    
+    with _READERS[ext](file_path, content) as rows:
+        timer.mark('open')
+        layout = find_layout(rows, file_path)
+        timer.mark('header')
+        if layout is None:
+            # Без заголовков не найти колонку дня - строк расписания нет
+            return
+        columns = layout.columns
         
-        if ext == '.xlsx':
-            # Используем openpyxl для .xlsx
-            wb = load_workbook(file_path, data_only=True)
-            ws = wb.active
-            
-            # Пытаемся найти заголовки
-            headers = []
-            header_row = None
-            
-            for row_idx, row in enumerate(ws.iter_rows(values_only=True), 1):
-                row_values = [str(cell).strip() if cell else '' for cell in row]
-                # Ищем строку с заголовками (обычно содержит "День", "Время", "Предмет" и т.д.)
-                if any(keyword in ' '.join(row_values).lower() for keyword in ['день', 'время', 'предмет', 'преподаватель', 'аудитория']):
-                    headers = row_values
-                    header_row = row_idx
-                    break
-            
-            if not headers:
-                # Если заголовки не найдены, используем первую строку
-                headers = [str(cell).strip() if cell else '' for cell in next(ws.iter_rows(values_only=True))]
-                header_row = 1
-            
-            # Определяем индексы колонок
-            day_col = None
-            time_col = None
-            subject_col = None
-            teacher_col = None
-            room_col = None
-            group_col = None
-            
-            for idx, header in enumerate(headers):
-                header_lower = header.lower()
-                if 'день' in header_lower or 'день недели' in header_lower:
-                    day_col = idx
-                elif 'время' in header_lower or 'час' in header_lower:
-                    time_col = idx
-                elif 'предмет' in header_lower or 'дисциплина' in header_lower:
-                    subject_col = idx
-                elif 'преподаватель' in header_lower or 'преп' in header_lower:
-                    teacher_col = idx
-                elif 'аудитория' in header_lower or 'кабинет' in header_lower or 'комната' in header_lower:
-                    room_col = idx
-                elif 'группа' in header_lower:
-                    group_col = idx
-            
-            # Парсим данные
-            added_count = 0
-            for row_idx, row in enumerate(ws.iter_rows(values_only=True, min_row=header_row + 1), header_row + 1):
-                row_values = [str(cell).strip() if cell else '' for cell in row]
-                
-                # Пропускаем пустые строки
-                if not any(row_values):
-                    continue
-                
-                day = row_values[day_col] if day_col is not None and day_col < len(row_values) else None
-                time = row_values[time_col] if time_col is not None and time_col < len(row_values) else None
-                subject = row_values[subject_col] if subject_col is not None and subject_col < len(row_values) else None
-                teacher = row_values[teacher_col] if teacher_col is not None and teacher_col < len(row_values) else None
-                room = row_values[room_col] if room_col is not None and room_col < len(row_values) else None
-                group = row_values[group_col] if group_col is not None and group_col < len(row_values) else None
-                
-                if day and time and subject:
-                    await add_schedule(
-                        specialty=specialty_name,
-                        day_of_week=day,
-                        time=time,
-                        subject=subject,
-                        teacher=teacher or None,
-                        room=room or None,
-                        group_name=group or None
-                    )
-                    added_count += 1
-            
-            return added_count
-            
-        elif ext == '.xls':
-            # Используем xlrd для .xls
-            workbook = xlrd.open_workbook(file_path)
-            sheet = workbook.sheet_by_index(0)
-            
-            # Ищем заголовки
-            headers = []
-            header_row = 0
-            
-            for row_idx in range(sheet.nrows):
-                row_values = [str(sheet.cell_value(row_idx, col)).strip() for col in range(sheet.ncols)]
-                if any(keyword in ' '.join(row_values).lower() for keyword in ['день', 'время', 'предмет', 'преподаватель']):
-                    headers = row_values
-                    header_row = row_idx
-                    break
-            
-            if not headers:
-                headers = [str(sheet.cell_value(0, col)).strip() for col in range(sheet.ncols)]
-            
-            # Определяем индексы колонок
-            day_col = None
-            time_col = None
-            subject_col = None
-            teacher_col = None
-            room_col = None
-            group_col = None
-            
-            for idx, header in enumerate(headers):
-                header_lower = header.lower()
-                if 'день' in header_lower:
-                    day_col = idx
-                elif 'время' in header_lower:
-                    time_col = idx
-                elif 'предмет' in header_lower:
-                    subject_col = idx
-                elif 'преподаватель' in header_lower:
-                    teacher_col = idx
-                elif 'аудитория' in header_lower:
-                    room_col = idx
-                elif 'группа' in header_lower:
-                    group_col = idx
-            
-            # Парсим данные
-            added_count = 0
-            for row_idx in range(header_row + 1, sheet.nrows):
-                row_values = [str(sheet.cell_value(row_idx, col)).strip() for col in range(sheet.ncols)]
-                
-                if not any(row_values):
-                    continue
-                
-                day = row_values[day_col] if day_col is not None and day_col < len(row_values) else None
-                time = row_values[time_col] if time_col is not None and time_col < len(row_values) else None
-                subject = row_values[subject_col] if subject_col is not None and subject_col < len(row_values) else None
-                teacher = row_values[teacher_col] if teacher_col is not None and teacher_col < len(row_values) else None
-                room = row_values[room_col] if room_col is not None and room_col < len(row_values) else None
-                group = row_values[group_col] if group_col is not None and group_col < len(row_values) else None
-                
-                if day and time and subject:
-                    await add_schedule(
-                        specialty=specialty_name,
-                        day_of_week=day,
-                        time=time,
-                        subject=subject,
-                        teacher=teacher or None,
-                        room=room or None,
-                        group_name=group or None
-                    )
-                    added_count += 1
-            
-            return added_count
+        for row_values in rows:
+            # Пропускаем пустые строки
+            if not any(row_values):
+                continue
             
-    except Exception as e:
-        logger.error(f"Ошибка при парсинге файла {file_path}: {str(e)}")
-        import traceback
-        logger.debug(traceback.format_exc())
-        return 0
+            day = _cell(row_values, columns['day'])
+            time = _cell(row_values, columns['time'])
+            subject = _cell(row_values, columns['subject'])
+            if day and time and subject:
+                yield (
+                    specialty_name, None, day, time, subject,
+                    _cell(row_values, columns['teacher']) or None,
+                    _cell(row_values, columns['room']) or None,
+                    _cell(row_values, columns['group']) or None
+                )
+        timer.mark('normalize')
+
+
+def iter_record_batches(file_path: str, specialty_name: str, batch_size: int = None,
+                        content: bytes = None):
+    """Записи расписания из файла пачками по batch_size (по умолчанию EXCEL_IMPORT_BATCH_SIZE)"""
+    records = iter_schedule_records(file_path, specialty_name, content=content)
+    batch_size = batch_size or EXCEL_IMPORT_BATCH_SIZE
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_workbook(file_path: str, specialty_name: str, engine: str = None,
+                   timings: dict = None, content: bytes = None) -> list:
+    """Прочитать все строки расписания из файла
+
+    Чистая функция без обращений к БД - выполняется в процессе-воркере.
+    engine - 'python' (потоковый разбор по строкам) или 'pandas'
+    (векторизованный разбор, см. utils.excel_pandas), по умолчанию
+    EXCEL_PARSER_ENGINE. Возвращает список кортежей в порядке
+    SCHEDULE_RECORD_COLUMNS (для 'pandas' - с ключами сортировки).
+    timings - словарь для времени этапов разбора, content - содержимое
+    файла в памяти (см. iter_schedule_records).
+    """
+    engine = engine or EXCEL_PARSER_ENGINE
+    if engine == 'python':
+        return list(iter_schedule_records(file_path, specialty_name, timings, content))
+    if engine == 'pandas':
+        # pandas загружается только при выборе этого движка
+        from utils.excel_pandas import parse_workbook_pandas
+        return parse_workbook_pandas(file_path, specialty_name, timings, content)
+    raise ValueError(f"Неизвестный движок разбора Excel: {engine}")
 
 
-async def load_all_excel_files():
-    """Загрузить все Excel файлы из папок"""
-    folders = [EXCEL_FOLDER_1, EXCEL_FOLDER_2]
-    total_added = 0
-    files_processed = 0
+def file_sha256(file_path: str) -> str:
+    """SHA-256 содержимого файла (hex)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _files_unchanged(ledger: dict, specialty_name: str, hashes: dict) -> bool:
+    """Совпадает ли набор файлов специальности и их хэши с журналом импорта"""
+    known_files = {path for path, entry in ledger.items() if entry['specialty'] == specialty_name}
+    return known_files == set(hashes) and all(
+        ledger[path]['content_hash'] == content_hash for path, content_hash in hashes.items()
+    )
+
+
+def _check_mode(mode: Optional[str]) -> str:
+    mode = mode or EXCEL_IMPORT_MODE
+    if mode not in EXCEL_IMPORT_MODES:
+        raise ValueError(f"Неизвестный режим импорта: {mode}")
+    return mode
+
+
+def _check_pipeline(pipeline: Optional[bool], engine: str) -> bool:
+    if pipeline is None:
+        # По умолчанию конвейер используется только там, где он возможен
+        return EXCEL_IMPORT_PIPELINE and engine == 'python'
+    if pipeline and engine != 'python':
+        raise ValueError("Конвейер импорта работает только с потоковым движком python")
+    return pipeline
+
+
+async def _sync_parsed_files(specialty_name: str, files: list, started: float, mode: str = None) -> dict:
+    """Записать разобранные файлы специальности в БД
+
+    files - (путь для журнала, хэш содержимого, записи файла).
+    mode - 'diff' (только отличия, см. sync_specialty_schedules) или
+    'replace' (замена целиком, см. replace_specialty_schedules).
+    """
+    mode = _check_mode(mode)
+    records = [record for _, _, file_records in files for record in file_records]
+    if not records:
+        # Иначе сравнение с пустым набором удалило бы все расписание специальности
+        raise ValueError(f"В файлах специальности {specialty_name} не найдено строк расписания")
+    parse_elapsed = time.perf_counter() - started
+    
+    ledger_files = [(path, content_hash, len(file_records)) for path, content_hash, file_records in files]
+    if mode == 'replace':
+        replaced = await replace_specialty_schedules(specialty_name, records, ledger_files)
+        stats = {'inserted': replaced['inserted'], 'updated': 0, 'deleted': replaced['deleted'], 'unchanged': 0}
+    else:
+        stats = await sync_specialty_schedules(specialty_name, records, ledger_files)
+    
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Специальность {specialty_name}: {len(records)} записей в файлах за {elapsed:.2f} с "
+        f"(разбор {parse_elapsed:.2f} с); добавлено {stats['inserted']}, "
+        f"обновлено {stats['updated']}, удалено {stats['deleted']}, без изменений {stats['unchanged']}"
+    )
+    return stats
+
+
+async def import_specialty_files(specialty_name: str, file_paths: list, executor: Executor = None,
+                                 ledger: dict = None, force: bool = False,
+                                 engine: str = None, mode: str = None,
+                                 pipeline: bool = False) -> Optional[dict]:
+    """Импорт всех файлов одной специальности
+
+    Если хэши файлов совпадают с журналом импорта (ledger, см. get_import_ledger),
+    файлы не разбираются и возвращается None. Иначе записи всех файлов
+    сравниваются с расписанием специальности в БД и применяются только
+    изменения (см. sync_specialty_schedules). force - импортировать без
+    проверки журнала, engine - движок разбора (см. parse_workbook),
+    mode - режим записи (см. _sync_parsed_files).
+    Хэширование и разбор выполняются в executor; при pipeline=True файлы
+    читаются и записываются потоково (см. utils.import_pipeline).
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    
+    hashes = await asyncio.gather(*(
+        loop.run_in_executor(executor, file_sha256, file_path) for file_path in file_paths
+    ))
+    if ledger is None:
+        ledger = await get_import_ledger()
+    if not force and _files_unchanged(ledger, specialty_name, dict(zip(file_paths, hashes))):
+        logger.info(f"Специальность {specialty_name}: файлы не изменились, импорт пропущен")
+        return None
+    
+    if pipeline:
+        from utils.import_pipeline import PipelineSource, run_import_pipeline
+        sources = [PipelineSource(path, content_hash, path) for path, content_hash in zip(file_paths, hashes)]
+        return await run_import_pipeline(specialty_name, sources, _check_mode(mode))
+    
+    parsed = await asyncio.gather(*(
+        loop.run_in_executor(executor, parse_workbook, file_path, specialty_name, engine)
+        for file_path in file_paths
+    ))
+    return await _sync_parsed_files(specialty_name, list(zip(file_paths, hashes, parsed)), started, mode)
+
+
+def specialty_from_filename(filename: str) -> str:
+    """Название специальности - имя файла без расширения"""
+    return os.path.splitext(os.path.basename(filename))[0].strip()
+
+
+async def import_excel_content(content: bytes, filename: str, specialty_name: str = None,
+                               force: bool = False, engine: str = None,
+                               mode: str = None) -> Optional[dict]:
+    """Импорт файла, полученного в память (например, документа из Telegram)
+
+    Файл не сохраняется на диск: содержимое разбирается из буфера в пуле
+    потоков. specialty_name по умолчанию берется из имени файла.
+    Расписание специальности приводится к содержимому файла так же, как
+    при загрузке из папок; в журнале импорта файл учитывается под именем
+    upload/<имя файла>. Возвращает None, если такой файл уже загружен.
+    С потоковым движком python файл проходит через конвейер импорта
+    (см. utils.import_pipeline), и в памяти держится несколько пачек записей.
+    """
+    if not is_excel_filename(filename):
+        raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+    mode = _check_mode(mode)
+    specialty_name = specialty_name or specialty_from_filename(filename)
+    started = time.perf_counter()
+    
+    ledger_path = f'{UPLOAD_LEDGER_PREFIX}{os.path.basename(filename)}'
+    content_hash = hashlib.sha256(content).hexdigest()
+    if not force and _files_unchanged(await get_import_ledger(), specialty_name, {ledger_path: content_hash}):
+        logger.info(f"Специальность {specialty_name}: файл {filename} не изменился, импорт пропущен")
+        return None
     
-    logger.info(f"Начало загрузки Excel файлов из папок: {folders}")
+    if (engine or EXCEL_PARSER_ENGINE) == 'python':
+        from utils.import_pipeline import PipelineSource, run_import_pipeline
+        await add_specialty(specialty_name)
+        source = PipelineSource(ledger_path, content_hash, filename, content)
+        return await run_import_pipeline(specialty_name, [source], mode)
     
+    loop = asyncio.get_running_loop()
+    records = await loop.run_in_executor(
+        None, partial(parse_workbook, filename, specialty_name, engine, content=content)
+    )
+    await add_specialty(specialty_name)
+    return await _sync_parsed_files(specialty_name, [(ledger_path, content_hash, records)], started, mode)
+
+
+async def import_excel_upload(content: bytes, filename: str, specialty_name: str = None,
+                              on_progress: Callable[[int, int, int], None] = None,
+                              **options) -> Optional[dict]:
+    """Импорт присланного файла как задача очереди импорта (см. utils.import_jobs)
+
+    То же, что import_excel_content, но с отчетом о прогрессе в формате
+    load_all_excel_files: on_progress(файлов обработано, всего, изменено записей).
+    """
+    if on_progress:
+        on_progress(0, 1, 0)
+    stats = await import_excel_content(content, filename, specialty_name, **options)
+    if on_progress:
+        on_progress(1, 1, stats['inserted'] + stats['updated'] + stats['deleted'] if stats else 0)
+    return stats
+
+
+def find_excel_files(folders=None) -> list:
+    """Список (путь к файлу, специальность) для Excel файлов в папках"""
+    if folders is None:
+        folders = [EXCEL_FOLDER_1, EXCEL_FOLDER_2]
+    
+    files = []
     for folder in folders:
         if not os.path.exists(folder):
             logger.warning(f"Папка {folder} не существует")
             continue
         
-        logger.info(f"Обработка папки: {folder}")
-        files_in_folder = [f for f in os.listdir(folder) if f.endswith(('.xls', '.xlsx'))]
+        files_in_folder = [f for f in os.listdir(folder) if is_excel_filename(f)]
         logger.info(f"Найдено файлов в {folder}: {len(files_in_folder)}")
         
         for filename in files_in_folder:
-            try:
-                file_path = os.path.join(folder, filename)
-                logger.info(f"Обработка файла: {filename}")
-                
-                # Извлекаем название специальности из имени файла
-                specialty_name = os.path.splitext(filename)[0]
-                logger.info(f"Специальность: {specialty_name}")
-                
-                # Добавляем специальность в БД
-                await add_specialty(specialty_name)
-                
-                # Парсим файл
-                added = await parse_excel_file(file_path, specialty_name)
-                total_added += added
-                files_processed += 1
-                logger.info(f"Файл {filename} обработан: добавлено {added} записей")
-            except Exception as e:
-                logger.error(f"Ошибка при обработке файла {filename}: {str(e)}")
-                continue
-    
-    logger.info(f"Загрузка завершена. Обработано файлов: {files_processed}, добавлено записей: {total_added}")
-    return total_added
+            # Название специальности - имя файла без расширения
+            files.append((os.path.join(folder, filename), specialty_from_filename(filename)))
+    return files
+
 
+async def load_all_excel_files(workers: int = None,
+                               folders: list = None,
+                               on_progress: Callable[[int, int, int], None] = None,
+                               force: bool = False,
+                               engine: str = None,
+                               mode: str = None,
+                               pipeline: bool = None):
+    """Загрузить все Excel файлы из папок
+
+    Повторная загрузка идемпотентна: неизмененные файлы пропускаются по хэшу
+    содержимого, для измененных применяются только отличия от БД
+    (см. import_specialty_files). force - заново сравнить все файлы с БД,
+    engine - движок разбора ('python' или 'pandas', по умолчанию EXCEL_PARSER_ENGINE),
+    folders - папки с файлами (по умолчанию EXCEL_FOLDER_1 и EXCEL_FOLDER_2),
+    mode - 'diff' или 'replace' (по умолчанию EXCEL_IMPORT_MODE, см. _sync_parsed_files).
+    pipeline - способ разбора (по умолчанию EXCEL_IMPORT_PIPELINE, если выбран
+    движок python). Без конвейера файлы разбираются параллельно в пуле процессов
+    (workers - число процессов, по умолчанию EXCEL_IMPORT_WORKERS), и записи
+    специальности целиком держатся в памяти. С конвейером специальности
+    импортируются по очереди в процессе бота с ограниченной памятью
+    (только для движка python, см. utils/import_pipeline.py).
+    on_progress(файлов обработано, всего файлов, изменено записей) вызывается
+    после каждой специальности.
+    Возвращает число добавленных, обновленных и удаленных записей.
+    """
+    engine = engine or EXCEL_PARSER_ENGINE
+    if engine not in EXCEL_PARSER_ENGINES:
+        raise ValueError(f"Неизвестный движок разбора Excel: {engine}")
+    mode = _check_mode(mode)
+    pipeline = _check_pipeline(pipeline, engine)
+    
+    folders = folders or [EXCEL_FOLDER_1, EXCEL_FOLDER_2]
+    logger.info(f"Начало загрузки Excel файлов из папок: {folders} (движок {engine})")
+    
+    files = find_excel_files(folders)
+    if on_progress:
+        on_progress(0, len(files), 0)
+    if not files:
+        logger.info("Загрузка завершена. Файлы не найдены")
+        return 0
+    
+    # Файлы одной специальности (например, из разных папок) сравниваются с БД вместе
+    specialty_files = {}
+    for file_path, specialty_name in files:
+        specialty_files.setdefault(specialty_name, []).append(file_path)
+    
+    workers = workers or EXCEL_IMPORT_WORKERS
+    started = time.perf_counter()
+    ledger = await get_import_ledger()
+    progress = {'files': 0, 'rows': 0}
+    
+    async def load_specialty(executor: Executor, specialty_name: str, file_paths: list) -> Optional[dict]:
+        try:
+            # Добавляем специальность в БД
+            await add_specialty(specialty_name)
+            stats = await import_specialty_files(
+                specialty_name, file_paths, executor, ledger, force, engine, mode, pipeline
+            )
+            changed = stats['inserted'] + stats['updated'] + stats['deleted'] if stats else 0
+        except Exception as e:
+            logger.error(f"Ошибка при обработке файлов {file_paths}: {str(e)}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            stats, changed = None, 0
+        
+        progress['files'] += len(file_paths)
+        progress['rows'] += changed
+        if on_progress:
+            on_progress(progress['files'], len(files), progress['rows'])
+        return stats
+    
+    if pipeline:
+        # Конвейер держит в памяти одну специальность за раз
+        results = [
+            await load_specialty(None, specialty_name, file_paths)
+            for specialty_name, file_paths in specialty_files.items()
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(files))) as executor:
+            results = await asyncio.gather(*(
+                load_specialty(executor, specialty_name, file_paths)
+                for specialty_name, file_paths in specialty_files.items()
+            ))
+    
+    imported = [stats for stats in results if stats is not None]
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Загрузка завершена за {elapsed:.2f} с: специальностей {len(specialty_files)}, "
+        f"импортировано {len(imported)}, пропущено или с ошибкой {len(specialty_files) - len(imported)}; "
+        f"добавлено {sum(s['inserted'] for s in imported)}, обновлено {sum(s['updated'] for s in imported)}, "
+        f"удалено {sum(s['deleted'] for s in imported)} "
+        f"({'конвейер' if pipeline else f'процессов: {min(workers, len(files))}'})"
+    )
+    return progress['rows']
@@ -1,55 +1,105 @@
+from database.schedule_keys import schedule_sort_key
+from utils.templates import escape
+
+
 def format_schedule(schedule: dict) -> str:
-    """Форматирование одной записи расписания"""
-    text = f"📚 <b>{schedule['subject']}</b>\n"
-    text += f"🕐 {schedule['time']}\n"
-    text += f"📅 {schedule['day_of_week']}\n"
-    
+    """Форматирование одной записи расписания (значения полей экранируются)"""
+    lines = [
+        f"📚 <b>{escape(schedule['subject'])}</b>",
+        f"🕐 {escape(schedule['time'])}",
+        f"📅 {escape(schedule['day_of_week'])}",
+    ]
+
     if schedule.get('teacher'):
-        text += f"👤 Преподаватель: {schedule['teacher']}\n"
+        lines.append(f"👤 Преподаватель: {escape(schedule['teacher'])}")
+    if schedule.get('room'):
+        lines.append(f"🏢 Аудитория: {escape(schedule['room'])}")
+    if schedule.get('group_name'):
+        lines.append(f"👥 Группа: {escape(schedule['group_name'])}")
+
+    lines.append("")
+    return "\n".join(lines)
+
+
+def text_length(text: str) -> int:
+    """Длина текста так, как ее считает Telegram (в единицах UTF-16)"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+
+# Длина постоянных частей заголовка дня и записи в format_schedules_list
+# (эмодзи считаются за 2 символа, как в UTF-16 у Telegram). Значения полей
+# считаются без экранирования и в единицах UTF-16 - Telegram ограничивает
+# длину текста после разбора разметки.
+_DAY_HEADER_LENGTH = len("\n📅 <b></b>\n") + 1
+_ENTRY_LENGTH = len("🕐  - \n\n") + 1
+_ROOM_LENGTH = len(" ()")
+_TEACHER_LENGTH = len("   👤 \n") + 1
+_GROUP_LENGTH = len("   👥 \n") + 1
+
+
+def day_header_length(day: str) -> int:
+    """Длина заголовка дня в format_schedules_list без форматирования"""
+    return _DAY_HEADER_LENGTH + text_length(day)
+
+
+def schedule_entry_length(schedule: dict) -> int:
+    """Длина записи в format_schedules_list без форматирования (для разбиения на страницы)"""
+    length = _ENTRY_LENGTH + text_length(schedule['time']) + text_length(schedule['subject'])
     if schedule.get('room'):
-        text += f"🏢 Аудитория: {schedule['room']}\n"
+        length += _ROOM_LENGTH + text_length(schedule['room'])
+    if schedule.get('teacher'):
+        length += _TEACHER_LENGTH + text_length(schedule['teacher'])
     if schedule.get('group_name'):
-        text += f"👥 Группа: {schedule['group_name']}\n"
-    
-    return text
+        length += _GROUP_LENGTH + text_length(schedule['group_name'])
+    return length
 
 
 def format_schedules_list(schedules: list, title: str = "Расписание") -> str:
-    """Форматирование списка расписаний"""
+    """Форматирование списка расписаний
+
+    Записи упорядочиваются по дню недели и времени начала (weekday, time_start),
+    а не по строкам дня и времени. Текст собирается из частей одним join.
+    В строках записей нет разметки, поэтому значения полей экранируются
+    одним вызовом на блок дня.
+    """
     if not schedules:
-        return f"❌ {title} не найдено"
-    
-    text = f"📋 <b>{title}</b>\n\n"
-    
+        return f"❌ {escape(title)} не найдено"
+
+    parts = [f"📋 <b>{escape(title)}</b>\n\n"]
+
     current_day = None
-    for schedule in schedules:
+    block = []
+    for schedule in sorted(schedules, key=schedule_sort_key):
         day = schedule['day_of_week']
         if day != current_day:
-            text += f"\n📅 <b>{day}</b>\n"
+            if block:
+                parts.append(escape("".join(block)))
+                block = []
+            parts.append(f"\n📅 <b>{escape(day)}</b>\n")
             current_day = day
-        
-        text += f"🕐 {schedule['time']} - {schedule['subject']}"
-        if schedule.get('room'):
-            text += f" ({schedule['room']})"
-        text += "\n"
-        
+
+        room = schedule.get('room')
+        block.append(
+            f"🕐 {schedule['time']} - {schedule['subject']} ({room})\n" if room
+            else f"🕐 {schedule['time']} - {schedule['subject']}\n"
+        )
         if schedule.get('teacher'):
-            text += f"   👤 {schedule['teacher']}\n"
+            block.append(f"   👤 {schedule['teacher']}\n")
         if schedule.get('group_name'):
-            text += f"   👥 {schedule['group_name']}\n"
-        text += "\n"
-    
-    return text
+            block.append(f"   👥 {schedule['group_name']}\n")
+        block.append("\n")
+    parts.append(escape("".join(block)))
+
+    return "".join(parts)
 
 
 def format_specialty_list(specialties: list) -> str:
     """Форматирование списка специальностей"""
     if not specialties:
         return "❌ Специальности не найдены"
-    
-    text = "📚 <b>Доступные специальности:</b>\n\n"
-    for spec in specialties:
-        text += f"• {spec['name']}\n"
-    
-    return text
 
+    return "📚 <b>Доступные специальности:</b>\n\n" + "".join(
+        f"• {escape(spec['name'])}\n" for spec in specialties
+    )
@@ -0,0 +1,157 @@
+"""
+Фоновые задачи импорта Excel файлов
+
+Задачи ставятся в очередь и выполняются по одной, поэтому одновременные
+загрузки (из папок и присланных файлов) не мешают друг другу. Разбор файлов
+идет вне цикла событий (см. load_all_excel_files), а состояние задачи
+можно опрашивать по id.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from utils.excel_parser import load_all_excel_files
+
+logger = logging.getLogger(__name__)
+
+# Сколько завершенных задач хранить для просмотра статуса
+_MAX_FINISHED_JOBS = 50
+
+
+class ImportJob:
+    """Задача импорта и ее прогресс"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, job_id: int, options: dict = None, loader: Callable[..., Awaitable] = None):
+        self.id = job_id
+        # Загрузчик задачи (None - загрузчик очереди) и его параметры (например, engine или force)
+        self.loader = loader
+        self.options = options or {}
+        # Значение, которое вернул загрузчик
+        self.result = None
+        self.status = self.QUEUED
+        self.files_total = 0
+        self.files_done = 0
+        self.rows_added = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._finished = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def elapsed(self) -> float:
+        """Время выполнения (с)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def rows_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.rows_added / elapsed if elapsed > 0 else 0.0
+
+    async def wait(self, timeout: float = None) -> bool:
+        """Дождаться завершения задачи (False - истек таймаут)"""
+        try:
+            await asyncio.wait_for(self._finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _update(self, files_done: int, files_total: int, rows_added: int):
+        self.files_done = files_done
+        self.files_total = files_total
+        self.rows_added = rows_added
+
+
+class ImportJobQueue:
+    """Очередь задач импорта с одним исполнителем"""
+
+    def __init__(self, loader: Callable[..., Awaitable[int]] = load_all_excel_files):
+        self._loader = loader
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._jobs: "OrderedDict[int, ImportJob]" = OrderedDict()
+        self._next_id = 1
+
+    def submit(self, loader: Callable[..., Awaitable] = None, **options) -> ImportJob:
+        """Поставить импорт в очередь и сразу вернуть задачу
+
+        options передаются загрузчику: loader (например, import_excel_upload)
+        или загрузчику очереди (load_all_excel_files). Загрузчик принимает
+        on_progress и возвращает число измененных записей либо результат,
+        который сохраняется в job.result (число записей тогда сообщает
+        on_progress).
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+        job = ImportJob(self._next_id, options, loader)
+        self._next_id += 1
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self._forget_finished()
+        logger.info(f"Задача импорта #{job.id} поставлена в очередь")
+        return job
+
+    def get(self, job_id: int) -> Optional[ImportJob]:
+        """Задача по id"""
+        return self._jobs.get(job_id)
+
+    def position(self, job: ImportJob) -> int:
+        """Число задач, стоящих в очереди перед указанной"""
+        return sum(
+            1 for other in self._jobs.values()
+            if other.id < job.id and not other.finished
+        )
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            job.status = ImportJob.RUNNING
+            job.started_at = time.time()
+            logger.info(f"Задача импорта #{job.id} запущена")
+            try:
+                loader = job.loader or self._loader
+                job.result = await loader(on_progress=job._update, **job.options)
+                if isinstance(job.result, int):
+                    job.rows_added = job.result
+                job.status = ImportJob.DONE
+                logger.info(
+                    f"Задача импорта #{job.id} завершена: {job.rows_added} записей "
+                    f"за {job.elapsed:.1f} с ({job.rows_per_sec:.0f} строк/с)"
+                )
+            except Exception as e:
+                job.status = ImportJob.FAILED
+                job.error = str(e)
+                logger.exception(f"Задача импорта #{job.id} завершилась с ошибкой")
+            finally:
+                # Завершенные задачи хранятся для просмотра статуса, а параметры
+                # (например, содержимое присланного файла) больше не нужны
+                job.options = {}
+                job.finished_at = time.time()
+                job._finished.set()
+                self._queue.task_done()
+
+
+
+# Общая очередь импорта бота
+import_jobs = ImportJobQueue()
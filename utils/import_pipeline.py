@@ -0,0 +1,266 @@
+"""
+Конвейер потокового импорта расписания: чтение -> нормализация -> проверка -> запись
+
+Этапы - корутины, связанные ограниченными очередями asyncio.Queue
+(EXCEL_IMPORT_QUEUE_SIZE пачек). Файл читается в пуле потоков по одной
+пачке; если запись в БД отстает, очереди заполняются и чтение
+приостанавливается, поэтому в памяти держится не больше нескольких пачек.
+
+Пачки сразу загружаются через COPY во временную таблицу (см.
+schedule_staging), когда набралось batch_size записей или прошло
+flush_interval секунд после предыдущей записи. После последней пачки
+расписание специальности приводится к временной таблице в SQL:
+- diff: применяются только отличия (sync_staging);
+- replace: расписание заменяется целиком (swap_staging).
+Поэтому и в режиме diff записи файла не накапливаются в памяти.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from config import EXCEL_IMPORT_BATCH_SIZE, EXCEL_IMPORT_FLUSH_INTERVAL, EXCEL_IMPORT_QUEUE_SIZE
+from database.db import copy_to_staging, schedule_staging, swap_staging, sync_staging
+from database.schedule_keys import schedule_sort_keys
+
+logger = logging.getLogger(__name__)
+
+# Ограничения колонок таблицы schedules (индекс в записи -> длина VARCHAR)
+SCHEDULE_COLUMN_LIMITS = {0: 255, 1: 50, 2: 20, 3: 20, 4: 255, 5: 255, 6: 50, 7: 50}
+
+# Обязательные поля записи: день, время, предмет
+_REQUIRED_FIELDS = (2, 3, 4)
+
+# Признак конца потока в очереди
+_DONE = None
+
+
+class PipelineSource(NamedTuple):
+    """Файл для импорта через конвейер"""
+    # Путь для журнала импорта
+    ledger_path: str
+    content_hash: str
+    # Путь к файлу (или имя файла, если передан content)
+    file_path: str
+    content: Optional[bytes] = None
+
+
+class StageStats:
+    """Счетчики этапа конвейера: пачки, записи, время работы и входная очередь"""
+
+    def __init__(self, name: str, inbox: asyncio.Queue = None):
+        self.name = name
+        self.inbox = inbox
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.busy = 0.0
+        self.started = time.perf_counter()
+
+    def add(self, rows: int, busy: float):
+        self.batches += 1
+        self.rows += rows
+        self.busy += busy
+
+    def snapshot(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'stage': self.name,
+            'batches': self.batches,
+            'rows': self.rows,
+            'rejected': self.rejected,
+            'busy_s': round(self.busy, 3),
+            'rows_per_s': round(self.rows / elapsed) if elapsed else 0,
+            'queue_depth': self.inbox.qsize() if self.inbox is not None else 0,
+            'queue_size': self.inbox.maxsize if self.inbox is not None else 0,
+        }
+
+
+# Специальность -> этапы выполняющегося или последнего конвейера
+_pipelines: Dict[str, List[StageStats]] = {}
+
+
+def get_pipeline_stats() -> Dict[str, List[Dict]]:
+    """Пропускная способность и глубина очередей этапов по специальностям"""
+    return {specialty: [stage.snapshot() for stage in stages] for specialty, stages in _pipelines.items()}
+
+
+def _normalize(batch: list) -> list:
+    """Дополнить записи ключами сортировки (weekday, time_start, time_end)"""
+    return [tuple(record) + schedule_sort_keys(record[2], record[3]) for record in batch]
+
+
+def _is_valid(record: Sequence) -> bool:
+    """Запись с обязательными полями, которая поместится в колонки schedules"""
+    if not all(record[idx] for idx in _REQUIRED_FIELDS):
+        return False
+    return all(
+        record[idx] is None or len(record[idx]) <= limit for idx, limit in SCHEDULE_COLUMN_LIMITS.items()
+    )
+
+
+async def _read(sources: Sequence[PipelineSource], specialty: str, outbox: asyncio.Queue,
+                stats: StageStats, batch_size: int):
+    """Чтение файлов пачками в пуле потоков; ждет, пока в очереди есть место"""
+    # Ленивый импорт: utils.excel_parser сам обращается к конвейеру
+    from utils.excel_parser import iter_record_batches
+
+    loop = asyncio.get_running_loop()
+    for index, source in enumerate(sources):
+        batches = iter_record_batches(source.file_path, specialty, batch_size, source.content)
+        reading = None
+        try:
+            while True:
+                started = time.perf_counter()
+                # shield: при отмене этапа чтение в потоке продолжается, и его
+                # нужно дождаться до закрытия генератора
+                reading = loop.run_in_executor(None, next, batches, None)
+                batch = await asyncio.shield(reading)
+                if batch is None:
+                    break
+                stats.add(len(batch), time.perf_counter() - started)
+                await outbox.put((index, batch))
+        finally:
+            if reading is not None and not reading.done():
+                # Иначе close() выполняющегося генератора вызовет ValueError
+                await asyncio.wait([reading])
+            batches.close()
+    await outbox.put(_DONE)
+
+
+async def _normalize_stage(inbox: asyncio.Queue, outbox: asyncio.Queue, stats: StageStats):
+    while (item := await inbox.get()) is not _DONE:
+        index, batch = item
+        started = time.perf_counter()
+        batch = _normalize(batch)
+        stats.add(len(batch), time.perf_counter() - started)
+        await outbox.put((index, batch))
+    await outbox.put(_DONE)
+
+
+async def _validate_stage(inbox: asyncio.Queue, outbox: asyncio.Queue, stats: StageStats, specialty: str):
+    while (item := await inbox.get()) is not _DONE:
+        index, batch = item
+        started = time.perf_counter()
+        valid = [record for record in batch if _is_valid(record)]
+        if len(valid) < len(batch):
+            if not stats.rejected:
+                rejected = next(record for record in batch if not _is_valid(record))
+                logger.warning(f"Специальность {specialty}: пропущена некорректная запись {rejected[:8]}")
+            stats.rejected += len(batch) - len(valid)
+        stats.add(len(valid), time.perf_counter() - started)
+        await outbox.put((index, valid))
+    await outbox.put(_DONE)
+
+
+class _StagingSink:
+    """Запись пачек во временную таблицу и применение к расписанию в конце"""
+
+    def __init__(self, conn, mode: str):
+        self.conn = conn
+        self.mode = mode
+
+    async def write(self, records: list):
+        await copy_to_staging(self.conn, records)
+
+    async def finish(self, specialty: str, files: list) -> Dict[str, int]:
+        if self.mode == 'diff':
+            return await sync_staging(self.conn, specialty, files)
+        swapped = await swap_staging(self.conn, specialty, files)
+        return {'inserted': swapped['inserted'], 'updated': 0, 'deleted': swapped['deleted'], 'unchanged': 0}
+
+
+async def _write_stage(inbox: asyncio.Queue, sink, stats: StageStats, file_rows: List[int],
+                       batch_size: int, flush_interval: float):
+    """Запись пачками по batch_size записей или раз в flush_interval секунд"""
+    loop = asyncio.get_running_loop()
+    buffer = []
+
+    async def flush():
+        nonlocal buffer
+        if buffer:
+            started = time.perf_counter()
+            await sink.write(buffer)
+            stats.add(len(buffer), time.perf_counter() - started)
+            buffer = []
+
+    deadline = loop.time() + flush_interval
+    while True:
+        try:
+            item = await asyncio.wait_for(inbox.get(), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            item = ()
+        if item is _DONE:
+            break
+        if item:
+            index, batch = item
+            buffer.extend(batch)
+            file_rows[index] += len(batch)
+        if len(buffer) >= batch_size or loop.time() >= deadline:
+            await flush()
+            deadline = loop.time() + flush_interval
+    await flush()
+
+
+async def _run_stages(coroutines: list):
+    """Запустить этапы; при ошибке одного этапа остальные отменяются"""
+    tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def run_import_pipeline(specialty: str, sources: Sequence[PipelineSource], mode: str,
+                              batch_size: int = None, queue_size: int = None,
+                              flush_interval: float = None) -> Dict:
+    """Импортировать файлы специальности через конвейер
+
+    mode - 'diff' или 'replace' (см. utils.excel_parser._sync_parsed_files).
+    batch_size, queue_size, flush_interval по умолчанию берутся из
+    EXCEL_IMPORT_BATCH_SIZE, EXCEL_IMPORT_QUEUE_SIZE, EXCEL_IMPORT_FLUSH_INTERVAL.
+    Возвращает статистику как sync_specialty_schedules, число пропущенных
+    некорректных записей (rejected) и счетчики этапов (stages).
+    """
+    batch_size = batch_size or EXCEL_IMPORT_BATCH_SIZE
+    queue_size = queue_size or EXCEL_IMPORT_QUEUE_SIZE
+    flush_interval = flush_interval or EXCEL_IMPORT_FLUSH_INTERVAL
+    started = time.perf_counter()
+
+    raw, normalized, validated = (asyncio.Queue(maxsize=queue_size) for _ in range(3))
+    stages = [
+        StageStats('read'),
+        StageStats('normalize', raw),
+        StageStats('validate', normalized),
+        StageStats('write', validated),
+    ]
+    _pipelines[specialty] = stages
+    file_rows = [0] * len(sources)
+
+    async with schedule_staging() as conn:
+        sink = _StagingSink(conn, mode)
+        await _run_stages([
+            _read(sources, specialty, raw, stages[0], batch_size),
+            _normalize_stage(raw, normalized, stages[1]),
+            _validate_stage(normalized, validated, stages[2], specialty),
+            _write_stage(validated, sink, stages[3], file_rows, batch_size, flush_interval),
+        ])
+        if not sum(file_rows):
+            # Иначе сравнение с пустым набором удалило бы все расписание специальности
+            raise ValueError(f"В файлах специальности {specialty} не найдено строк расписания")
+
+        files = [(source.ledger_path, source.content_hash, rows) for source, rows in zip(sources, file_rows)]
+        stats = await sink.finish(specialty, files)
+
+    stats['rejected'] = stages[2].rejected
+    stats['stages'] = [stage.snapshot() for stage in stages]
+    logger.info(
+        f"Конвейер {specialty}: {sum(file_rows)} записей за {time.perf_counter() - started:.2f} с "
+        f"(пропущено {stats['rejected']}); добавлено {stats['inserted']}, обновлено {stats['updated']}, "
+        f"удалено {stats['deleted']}; этапы: "
+        + ', '.join(f"{stage.name} {stage.rows} зап./{stage.busy:.2f} с" for stage in stages)
+    )
+    return stats
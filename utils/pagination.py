@@ -0,0 +1,154 @@
+"""
+Разбиение длинных списков расписания на страницы сообщения
+
+Telegram не принимает сообщения длиннее 4096 символов (UTF-16). Список
+делится на страницы по границам записей, а если возможно - по границам
+дней. Длины записей считаются без форматирования (schedule_entry_length),
+поэтому текст формируется только для показываемой страницы.
+
+Индекс страниц (записи и их границы) хранится по ключу (чат, сообщение),
+и листание страниц (кнопки page_N) не обращается к БД. Если индекс
+вытеснен из кэша, обработчик листания просит открыть список заново.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from config import PAGE_CACHE_SIZE, PAGE_CACHE_TTL
+from database.cache import TTLCache
+from database.db import get_schedules_by_specialty
+from database.schedule_keys import schedule_sort_key
+from keyboards.inline import get_page_nav_keyboard
+from utils.formatters import day_header_length, format_schedules_list, schedule_entry_length, text_length
+from utils.schedule_render import render_schedule
+
+# Максимальная длина текста сообщения в Telegram
+MESSAGE_LIMIT = 4096
+
+# Минимальный объем страницы: не обрывать страницу на границе дня, если она
+# заполнена меньше чем наполовину
+_MIN_PAGE_FILL = 0.5
+
+# Длина заголовка списка в format_schedules_list с пустым названием
+_LIST_TITLE_LENGTH = 12
+
+
+class PagedMessage(NamedTuple):
+    """Индекс страниц сообщения"""
+    header: str
+    # Записи в порядке показа
+    schedules: list
+    # Границы страниц [начало, конец) в schedules
+    pages: List[Tuple[int, int]]
+    # Клавиатура под навигацией
+    reply_markup: Optional[InlineKeyboardMarkup]
+
+
+_page_cache = TTLCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+
+
+def split_pages(schedules: list, limit: int) -> List[Tuple[int, int]]:
+    """Границы страниц для отсортированных записей
+
+    Страница занимает не больше limit символов вместе с заголовками дней
+    (на новой странице заголовок дня повторяется). Если день начался на
+    текущей странице и она заполнена хотя бы наполовину, страница
+    заканчивается перед этим днем. В неотсортированном списке заголовок
+    учитывается при каждой смене дня - с запасом, так как на странице
+    записи группируются по дням.
+    """
+    pages = []
+    start = day_start = 0
+    size = size_before_day = _LIST_TITLE_LENGTH
+    current_day = None
+    for idx, schedule in enumerate(schedules):
+        day = schedule['day_of_week']
+        cost = schedule_entry_length(schedule)
+        if day != current_day or idx == start:
+            cost += day_header_length(day)
+        if day != current_day:
+            day_start, size_before_day = idx, size
+            current_day = day
+
+        if idx > start and size + cost > limit:
+            moved = size - size_before_day
+            if (start < day_start < idx and size_before_day >= limit * _MIN_PAGE_FILL
+                    and _LIST_TITLE_LENGTH + moved + cost <= limit):
+                # Переносим начатый день на новую страницу целиком
+                pages.append((start, day_start))
+                start = day_start
+                size = _LIST_TITLE_LENGTH + moved
+            else:
+                pages.append((start, idx))
+                start = day_start = idx
+                size = _LIST_TITLE_LENGTH
+                cost = schedule_entry_length(schedule) + day_header_length(day)
+            size_before_day = _LIST_TITLE_LENGTH
+        size += cost
+    pages.append((start, len(schedules)))
+    return pages
+
+
+def page_text(paged: PagedMessage, page: int) -> str:
+    """Текст страницы (форматируются только ее записи)"""
+    start, end = paged.pages[page]
+    return paged.header + format_schedules_list(paged.schedules[start:end], "")
+
+
+async def show_paged(message: Message, header: str, schedules: list,
+                     reply_markup: InlineKeyboardMarkup = None, edit: bool = True,
+                     sort: bool = True) -> Message:
+    """Показать первую страницу списка с кнопками навигации
+
+    edit - изменить message (сообщение с кнопкой), иначе ответить новым
+    сообщением. sort=False сохраняет порядок записей (например, по
+    релевантности поиска): страницы идут в этом порядке, а по дням
+    упорядочиваются только записи внутри страницы. Если список
+    помещается в одно сообщение, навигации нет.
+    """
+    if sort:
+        schedules = sorted(schedules, key=schedule_sort_key)
+    limit = MESSAGE_LIMIT - text_length(header)
+    paged = PagedMessage(header, schedules, split_pages(schedules, limit), reply_markup)
+
+    text = page_text(paged, 0)
+    if len(paged.pages) > 1:
+        reply_markup = get_page_nav_keyboard(0, len(paged.pages), reply_markup)
+    if edit:
+        sent = await message.edit_text(text, reply_markup=reply_markup)
+        # edit_text возвращает True для inline-сообщений
+        sent = sent if isinstance(sent, Message) else message
+    else:
+        sent = await message.answer(text, reply_markup=reply_markup)
+
+    if len(paged.pages) > 1:
+        _page_cache.set((sent.chat.id, sent.message_id), paged)
+    return sent
+
+
+async def show_schedule(message: Message, header: str, specialty: str, day: str = None,
+                        reply_markup: InlineKeyboardMarkup = None):
+    """Показать расписание специальности на день (None - на неделю)
+
+    Текст берется из кэша готовых текстов (см. render_schedule); на страницы
+    делится только расписание, не помещающееся в одно сообщение.
+    """
+    text = header + await render_schedule(specialty, day)
+    if text_length(text) <= MESSAGE_LIMIT:
+        await message.edit_text(text, reply_markup=reply_markup)
+        return
+    # Записи уже в кэше выборок после render_schedule
+    await show_paged(message, header, await get_schedules_by_specialty(specialty, day), reply_markup)
+
+
+def get_page(chat_id: int, message_id: int, page: int) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    """Текст и клавиатура страницы сообщения (None - индекс страниц не найден)"""
+    paged = _page_cache.get((chat_id, message_id))
+    if paged is None or not 0 <= page < len(paged.pages):
+        return None
+    return page_text(paged, page), get_page_nav_keyboard(page, len(paged.pages), paged.reply_markup)
+
+
+def get_page_cache_stats() -> dict:
+    """Статистика кэша индексов страниц"""
+    return _page_cache.stats()
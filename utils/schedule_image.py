@@ -0,0 +1,369 @@
+"""
+Расписание на неделю картинкой (сетка PNG: дни недели x пары)
+
+Картинка рисуется в пуле потоков, чтобы не блокировать цикл событий,
+и хранится на диске под хэшем содержимого расписания (специальность,
+группа и показываемые поля записей). Хэш вычисляется один раз для
+версии расписания (см. get_schedule_version), поэтому после перезапуска
+бота картинки с диска тоже используются, а после изменения расписания
+рисуются заново.
+
+После первой отправки file_id картинки в Telegram сохраняется рядом с
+картинками (file_ids.json), и повторные запросы отправляют фото по
+file_id: без рисования и без повторной загрузки файла.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, InlineKeyboardMarkup, Message
+from PIL import Image, ImageDraw, ImageFont
+
+from config import (
+    RENDER_CACHE_SIZE, RENDER_CACHE_TTL,
+    SCHEDULE_IMAGE_CACHE_DIR, SCHEDULE_IMAGE_CACHE_MAX_FILES, SCHEDULE_IMAGE_FONT
+)
+from database.cache import TTLCache
+from database.db import get_schedule_version, get_schedules_by_specialty
+from database.schedule_keys import schedule_sort_key
+from utils.templates import render
+
+logger = logging.getLogger(__name__)
+
+# Размеры сетки (пиксели)
+_PADDING = 16
+_TIME_COLUMN_WIDTH = 120
+_DAY_COLUMN_WIDTH = 230
+_CELL_PADDING = 8
+_FONT_SIZE = 15
+_TITLE_FONT_SIZE = 22
+_LINE_SPACING = 4
+
+# Цвета
+_BACKGROUND = (255, 255, 255)
+_HEADER_BACKGROUND = (52, 101, 164)
+_HEADER_TEXT = (255, 255, 255)
+_TIME_BACKGROUND = (233, 239, 247)
+_GRID = (190, 198, 210)
+_TEXT = (33, 33, 33)
+_SECONDARY_TEXT = (96, 96, 96)
+
+# Шрифты с кириллицей (Pillow ищет их в системных папках шрифтов)
+_FALLBACK_FONTS = ('DejaVuSans.ttf', 'arial.ttf')
+
+# Поля записи, от которых зависит картинка
+_IMAGE_FIELDS = ('day_of_week', 'time', 'subject', 'room', 'teacher', 'group_name')
+
+_FILE_IDS_NAME = 'file_ids.json'
+
+# (специальность, группа, версия) -> хэш содержимого картинки
+_digests = TTLCache(maxsize=RENDER_CACHE_SIZE, ttl=RENDER_CACHE_TTL)
+# Хэш -> file_id загруженной картинки (читается с диска при первом обращении)
+_file_ids: Optional[Dict[str, str]] = None
+# Хэш -> [блокировка, число запросов, которые ее держат или ждут]: одну
+# картинку одновременно рисует и загружает один запрос. Блокировка
+# удаляется, когда ее не ждет ни один запрос.
+_locks: Dict[str, list] = {}
+
+_stats = {'file_id': 0, 'disk': 0, 'rendered': 0}
+
+
+@lru_cache(maxsize=None)
+def _font(size: int) -> ImageFont.ImageFont:
+    """Шрифт нужного размера (SCHEDULE_IMAGE_FONT или первый найденный из запасных)"""
+    for name in filter(None, (SCHEDULE_IMAGE_FONT,) + _FALLBACK_FONTS):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    logger.warning("Шрифт с кириллицей не найден, задайте SCHEDULE_IMAGE_FONT")
+    return ImageFont.load_default(size)
+
+
+def _wrap(text: str, font: ImageFont.ImageFont, width: int) -> List[str]:
+    """Перенос текста по словам в пределах ширины width"""
+    lines = []
+    line = ''
+    for word in text.split():
+        candidate = f'{line} {word}' if line else word
+        if line and font.getlength(candidate) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines or ['']
+
+
+def filter_group(schedules: list, group: Optional[str]) -> list:
+    """Записи группы и общие записи специальности (без группы)"""
+    if not group:
+        return schedules
+    group = group.strip().casefold()
+    return [
+        schedule for schedule in schedules
+        if not schedule.get('group_name') or schedule['group_name'].strip().casefold() == group
+    ]
+
+
+def schedules_digest(specialty: str, group: Optional[str], schedules: list) -> str:
+    """Хэш содержимого картинки (не зависит от порядка записей)"""
+    rows = sorted(
+        tuple(schedule.get(field) or '' for field in _IMAGE_FIELDS) for schedule in schedules
+    )
+    payload = json.dumps([specialty, group or '', rows], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def draw_week(title: str, schedules: list) -> bytes:
+    """PNG с сеткой расписания на неделю
+
+    Столбцы - дни недели, в которых есть записи, строки - пары по времени
+    начала. Несколько записей в одной клетке (разные группы) выводятся
+    друг под другом. Функция синхронная и вызывается в пуле потоков.
+    """
+    font = _font(_FONT_SIZE)
+    title_font = _font(_TITLE_FONT_SIZE)
+    line_height = font.getbbox('Ág')[3] + _LINE_SPACING
+    text_width = _DAY_COLUMN_WIDTH - 2 * _CELL_PADDING
+
+    # Дни в порядке schedule_sort_key (нераспознанные - в конце), пары по
+    # самому раннему времени начала среди дней
+    days: List[str] = []
+    slot_keys: Dict[str, tuple] = {}
+    cells: Dict[Tuple[str, str], List[Tuple[str, tuple]]] = {}
+    for schedule in sorted(schedules, key=schedule_sort_key):
+        day, slot = schedule['day_of_week'], schedule['time']
+        if day not in days:
+            days.append(day)
+        slot_key = schedule_sort_key(schedule)[2:]
+        if slot not in slot_keys or slot_key < slot_keys[slot]:
+            slot_keys[slot] = slot_key
+        lines = cells.setdefault((day, slot), [])
+        if lines:
+            lines.append(('', _GRID))
+        lines.extend((line, _TEXT) for line in _wrap(schedule['subject'], font, text_width))
+        details = ', '.join(filter(None, (schedule.get('room'), schedule.get('teacher'))))
+        if details:
+            lines.extend((line, _SECONDARY_TEXT) for line in _wrap(details, font, text_width))
+        if schedule.get('group_name'):
+            lines.extend(
+                (line, _SECONDARY_TEXT) for line in _wrap(f"Группа: {schedule['group_name']}", font, text_width)
+            )
+    slots = sorted(slot_keys, key=slot_keys.get)
+
+    title_height = title_font.getbbox('Ág')[3] + 2 * _PADDING
+    header_height = line_height + 2 * _CELL_PADDING
+    row_heights = [
+        max(len(cells.get((day, slot), ())) for day in days) * line_height + 2 * _CELL_PADDING
+        for slot in slots
+    ]
+    width = 2 * _PADDING + _TIME_COLUMN_WIDTH + len(days) * _DAY_COLUMN_WIDTH
+    height = title_height + header_height + sum(row_heights) + _PADDING
+
+    image = Image.new('RGB', (width, height), _BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.text((_PADDING, _PADDING), title, font=title_font, fill=_TEXT)
+
+    top = title_height
+    right = width - _PADDING
+    draw.rectangle((_PADDING, top, right, top + header_height), fill=_HEADER_BACKGROUND)
+    for idx, day in enumerate(days):
+        left = _PADDING + _TIME_COLUMN_WIDTH + idx * _DAY_COLUMN_WIDTH
+        draw.text((left + _CELL_PADDING, top + _CELL_PADDING), day, font=font, fill=_HEADER_TEXT)
+
+    y = top + header_height
+    for slot, row_height in zip(slots, row_heights):
+        draw.rectangle((_PADDING, y + 1, _PADDING + _TIME_COLUMN_WIDTH, y + row_height), fill=_TIME_BACKGROUND)
+        for line_idx, line in enumerate(_wrap(slot, font, _TIME_COLUMN_WIDTH - 2 * _CELL_PADDING)):
+            draw.text((_PADDING + _CELL_PADDING, y + _CELL_PADDING + line_idx * line_height),
+                      line, font=font, fill=_TEXT)
+        for idx, day in enumerate(days):
+            left = _PADDING + _TIME_COLUMN_WIDTH + idx * _DAY_COLUMN_WIDTH + _CELL_PADDING
+            for line_idx, (line, color) in enumerate(cells.get((day, slot), ())):
+                draw.text((left, y + _CELL_PADDING + line_idx * line_height), line, font=font, fill=color)
+        y += row_height
+        draw.line((_PADDING, y, right, y), fill=_GRID)
+
+    # Вертикальные линии сетки
+    bottom = y
+    for x in [_PADDING, _PADDING + _TIME_COLUMN_WIDTH] + [
+        _PADDING + _TIME_COLUMN_WIDTH + (idx + 1) * _DAY_COLUMN_WIDTH for idx in range(len(days))
+    ]:
+        draw.line((x, top, x, bottom), fill=_GRID)
+    draw.rectangle((_PADDING, top, right, bottom), outline=_GRID)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _image_path(digest: str) -> str:
+    return os.path.join(SCHEDULE_IMAGE_CACHE_DIR, f'{digest}.png')
+
+
+def _write_image(digest: str, content: bytes, keep: frozenset = frozenset()):
+    """Сохранить картинку атомарно и удалить самые старые при переполнении папки
+
+    keep - хэши картинок, которые сейчас отправляются или рисуются: их не удаляем.
+    """
+    os.makedirs(SCHEDULE_IMAGE_CACHE_DIR, exist_ok=True)
+    path = _image_path(digest)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+    images = [entry for entry in os.scandir(SCHEDULE_IMAGE_CACHE_DIR) if entry.name.endswith('.png')]
+    excess = len(images) - SCHEDULE_IMAGE_CACHE_MAX_FILES
+    if excess > 0:
+        images = [entry for entry in images if entry.name[:-len('.png')] not in keep]
+        images.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in images[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _load_file_ids() -> Dict[str, str]:
+    """file_id загруженных картинок (один раз на процесс)"""
+    global _file_ids
+    if _file_ids is None:
+        _file_ids = {}
+        path = os.path.join(SCHEDULE_IMAGE_CACHE_DIR, _FILE_IDS_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                _file_ids = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"file_id картинок {path} не прочитаны: {e}")
+    return _file_ids
+
+
+def _save_file_ids(file_ids: Dict[str, str]):
+    """Записать копию file_id на диск (только для картинок, оставшихся в папке)"""
+    file_ids = {digest: file_id for digest, file_id in file_ids.items()
+                if os.path.exists(_image_path(digest))}
+    path = os.path.join(SCHEDULE_IMAGE_CACHE_DIR, _FILE_IDS_NAME)
+    try:
+        os.makedirs(SCHEDULE_IMAGE_CACHE_DIR, exist_ok=True)
+        # Сохранения из разных потоков пула пишут каждое в свой временный файл
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(file_ids, f, indent=1)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"file_id картинок {path} не сохранены: {e}")
+
+
+def _read_image(digest: str) -> Optional[bytes]:
+    """Картинка с диска (None - ее нет или ее уже удалила очистка папки)"""
+    try:
+        with open(_image_path(digest), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def _render_image(digest: str, specialty: str, group: Optional[str],
+                        schedules: Optional[List[Dict]]) -> bytes:
+    """Нарисовать картинку и сохранить ее на диск (вызывается под блокировкой хэша)"""
+    loop = asyncio.get_running_loop()
+    if schedules is None:
+        schedules = filter_group(await get_schedules_by_specialty(specialty), group)
+    title = f'{specialty} - группа {group}' if group else specialty
+    content = await loop.run_in_executor(None, draw_week, title, schedules)
+    # Набор занятых хэшей берется в цикле событий, пока _locks не меняется
+    await loop.run_in_executor(None, _write_image, digest, content, frozenset(_locks))
+    _stats['rendered'] += 1
+    return content
+
+
+async def _send_by_file_id(message: Message, digest: str, caption: str,
+                           reply_markup: InlineKeyboardMarkup) -> Optional[Message]:
+    """Отправить картинку по сохраненному file_id (None - file_id нет или он не принят)"""
+    file_ids = _load_file_ids()
+    file_id = file_ids.get(digest)
+    if not file_id:
+        return None
+    try:
+        sent = await message.answer_photo(file_id, caption=caption, reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        # file_id другого бота или удаленный файл - загружаем заново
+        logger.warning(f"Картинка расписания {digest} не отправлена по file_id: {e}")
+        if file_ids.get(digest) == file_id:
+            del file_ids[digest]
+        return None
+    _stats['file_id'] += 1
+    return sent
+
+
+async def send_week_image(message: Message, specialty: str, group: str = None,
+                          reply_markup: InlineKeyboardMarkup = None) -> Optional[Message]:
+    """Отправить расписание специальности (или группы) на неделю картинкой
+
+    Порядок поиска: file_id в Telegram, PNG на диске, рисование заново.
+    Возвращает отправленное сообщение или None, если записей нет.
+    """
+    group = (group or '').strip() or None
+    key = (specialty, group, get_schedule_version(specialty))
+    digest = _digests.get(key)
+    schedules = None
+    if digest is None:
+        schedules = filter_group(await get_schedules_by_specialty(specialty), group)
+        if not schedules:
+            return None
+        digest = schedules_digest(specialty, group, schedules)
+        _digests.set(key, digest)
+
+    caption = render('week_image_group' if group else 'week_image', specialty=specialty, group=group or '')
+    file_ids = _load_file_ids()
+    loop = asyncio.get_running_loop()
+
+    # Уже загруженную картинку отправляем без блокировки
+    sent = await _send_by_file_id(message, digest, caption, reply_markup)
+    if sent is not None:
+        return sent
+
+    entry = _locks.setdefault(digest, [asyncio.Lock(), 0])
+    entry[1] += 1
+    lock = entry[0]
+    try:
+        async with lock:
+            # Пока запрос ждал, картинку мог загрузить другой запрос
+            sent = await _send_by_file_id(message, digest, caption, reply_markup)
+            if sent is not None:
+                return sent
+
+            # Картинка читается в память: очистка папки другим запросом может
+            # удалить файл во время загрузки в Telegram
+            content = await loop.run_in_executor(None, _read_image, digest)
+            if content is not None:
+                _stats['disk'] += 1
+            else:
+                content = await _render_image(digest, specialty, group, schedules)
+
+            photo = BufferedInputFile(content, filename=f'{digest}.png')
+            sent = await message.answer_photo(photo, caption=caption, reply_markup=reply_markup)
+            file_ids[digest] = sent.photo[-1].file_id
+            await loop.run_in_executor(None, _save_file_ids, dict(file_ids))
+            return sent
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _locks[digest]
+
+
+def get_image_cache_stats() -> Dict:
+    """Откуда отправлялись картинки: по file_id, с диска или нарисованы заново"""
+    return dict(_stats, digests=_digests.stats(), file_ids=len(_load_file_ids()))
@@ -0,0 +1,42 @@
+"""
+Кэш готовых текстов расписания
+
+Один и тот же экран (расписание специальности на день) запрашивают сотни
+студентов, поэтому текст форматируется один раз и хранится по ключу
+(специальность, день, версия расписания, шаблон). Версия берется до
+чтения данных и растет при любом изменении расписания специальности
+(см. get_schedule_version), так что устаревший текст больше не
+запрашивается и вытесняется из кэша по LRU или времени жизни.
+"""
+from typing import Callable, Dict, Optional
+
+from config import RENDER_CACHE_SIZE, RENDER_CACHE_TTL
+from database.cache import TTLCache
+from database.db import get_schedule_version, get_schedules_by_specialty
+from utils.formatters import format_schedules_list
+
+# Шаблон -> функция форматирования списка записей
+RENDER_TEMPLATES: Dict[str, Callable[[list], str]] = {
+    'list': lambda schedules: format_schedules_list(schedules, ""),
+}
+
+_render_cache = TTLCache(maxsize=RENDER_CACHE_SIZE, ttl=RENDER_CACHE_TTL)
+
+
+async def render_schedule(specialty: str, day: Optional[str] = None, template: str = 'list') -> str:
+    """Текст расписания специальности на день (None - на всю неделю)
+
+    При попадании в кэш обходится без обращения к БД и форматирования.
+    """
+    key = (specialty, day or None, get_schedule_version(specialty), template)
+    text = _render_cache.get(key)
+    if text is None:
+        schedules = await get_schedules_by_specialty(specialty, day)
+        text = RENDER_TEMPLATES[template](schedules)
+        _render_cache.set(key, text)
+    return text
+
+
+def get_render_cache_stats() -> Dict:
+    """Статистика кэша готовых текстов"""
+    return _render_cache.stats()
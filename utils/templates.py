@@ -0,0 +1,90 @@
+"""
+Шаблоны сообщений с HTML-разметкой
+
+Шаблоны разбираются один раз при загрузке модуля, а при подстановке
+все значения экранируются, поэтому названия предметов, имена файлов
+и текст пользователя не ломают и не подменяют разметку. Готовый HTML
+(например, результат другого шаблона) подставляется без изменений,
+если обернут в Html.
+
+Использование: render('search_results', query=message.text)
+"""
+from string import Formatter
+from types import MappingProxyType
+from typing import Any, Mapping
+
+
+class Html(str):
+    """Доверенный HTML: подставляется в шаблоны без экранирования"""
+
+
+def escape(value: Any) -> str:
+    """Экранировать значение для parse_mode=HTML (Html остается как есть)"""
+    if isinstance(value, Html):
+        return value
+    value = str(value)
+    # В названиях почти никогда нет спецсимволов - проверка быстрее замен
+    if '&' in value or '<' in value or '>' in value:
+        return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return value
+
+
+class Template:
+    """Шаблон в синтаксисе str.format, разобранный на части заранее"""
+
+    __slots__ = ('source', '_parts')
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts = tuple(
+            (literal, field, spec) for literal, field, spec, _ in Formatter().parse(source)
+        )
+
+    def render(self, **values) -> Html:
+        parts = []
+        for literal, field, spec in self._parts:
+            parts.append(literal)
+            if field is not None:
+                value = values[field]
+                parts.append(escape(format(value, spec) if spec else value))
+        return Html(''.join(parts))
+
+
+TEMPLATES: Mapping[str, Template] = MappingProxyType({key: Template(source) for key, source in {
+    # Расписание
+    'schedule_specialty': "📋 <b>Расписание для специальности: {specialty}</b>\n\n",
+    'schedule_today': "📅 <b>Расписание на сегодня ({day})</b>\nСпециальность: {specialty}\n\n",
+    'schedule_day': "📅 <b>Расписание на {day}</b>\nСпециальность: {specialty}\n\n",
+    'specialty_set': (
+        "✅ Специальность установлена: <b>{specialty}</b>\n\n"
+        "Теперь вы можете просматривать расписание."
+    ),
+    'search_results': "🔍 <b>Результаты поиска по запросу: {query}</b>\n\n",
+    'search_empty': "❌ По запросу '{query}' ничего не найдено",
+    'group_current': "\n\nТекущая группа: <b>{group}</b>",
+    'group_set': "✅ Группа установлена: <b>{group}</b>",
+    'week_image': "🖼 Расписание на неделю: <b>{specialty}</b>",
+    'week_image_group': "🖼 Расписание на неделю: <b>{specialty}</b>, группа <b>{group}</b>",
+
+    # Преподаватель
+    'add_specialty_chosen': "✅ Специальность: <b>{specialty}</b>\n\nВведите день недели (например: Понедельник):",
+    'specialty_added': "✅ Специальность '{specialty}' добавлена!",
+    'specialty_item': "• {name}\n",
+    'import_failed': "❌ Ошибка при загрузке:\n\n<code>{error}</code>",
+    'upload_started': "📥 Загрузка файла <b>{file_name}</b> для специальности <b>{specialty}</b>...",
+    'upload_unchanged': "ℹ️ Файл <b>{file_name}</b> уже загружен, изменений нет.",
+    'upload_done': (
+        "✅ Расписание <b>{specialty}</b> обновлено!\n\n"
+        "Добавлено: {inserted}, изменено: {updated}, удалено: {deleted}, без изменений: {unchanged}"
+    ),
+    'upload_received': (
+        "📄 Файл <b>{file_name}</b> получен.\n\n"
+        "Введите название специальности или возьмите его из имени файла "
+        "(или /cancel для отмены):"
+    ),
+}.items()})
+
+
+def render(key: str, **values) -> Html:
+    """Текст сообщения по шаблону из TEMPLATES"""
+    return TEMPLATES[key].render(**values)